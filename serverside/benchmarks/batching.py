@@ -0,0 +1,127 @@
+"""
+Publisher batching and permessage-deflate settings: throughput and CPU versus added latency.
+
+    python -m benchmarks.batching --rate 200 --delays 0 5 20 --compression none deflate deflate:1
+
+Each setting publishes --rate frames/s (default: 10 sensors at 20 fps) to a
+fresh loopback relay for --duration seconds while one subscriber process
+measures capture-to-delivery latency. Publisher CPU per frame comes from the
+publisher process alone. Compression specs are "none", "deflate",
+"deflate:<level>" or "deflate:<level>:<window_bits>".
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from benchmarks.loadtest import free_port, start_relay, subscriber_worker  # noqa: E402
+from mmvs.batching import FrameBatcher, compression_options  # noqa: E402
+from mmvs.source import DummySensor  # noqa: E402
+
+
+def parse_compression(spec):
+    parts = spec.split(":")
+    level = parts[1] if len(parts) > 1 else None
+    window_bits = parts[2] if len(parts) > 2 else None
+    return compression_options(parts[0], level=level, window_bits=window_bits)
+
+
+async def publish(uri, spec, delay_s, rate, seconds):
+    import websockets
+    sensor = DummySensor()
+    batcher = FrameBatcher(delay_s, max_frames=64)
+    period = 1.0 / rate
+    frames = messages = raw_bytes = 0
+
+    async with websockets.connect(uri, **parse_compression(spec)) as ws:
+        cpu0 = time.process_time()
+        start = time.monotonic()
+        next_frame = start
+        while time.monotonic() - start < seconds:
+            now = time.monotonic()
+            if now >= next_frame:
+                data = sensor.get_data()
+                data.ts = time.time()
+                data.seq = frames
+                batcher.add(data.to_json())
+                frames += 1
+                next_frame += period
+            if batcher.due():
+                message = batcher.flush()
+                raw_bytes += len(message)
+                messages += 1
+                await ws.send(message)
+            wait = next_frame - time.monotonic()
+            due = batcher.time_until_due()
+            if due is not None:
+                wait = min(wait, due)
+            await asyncio.sleep(max(0.0, wait))
+        elapsed = time.monotonic() - start
+        cpu = time.process_time() - cpu0
+
+    return {"frames": frames, "messages": messages, "frames_per_s": frames / elapsed,
+            "frames_per_message": frames / max(messages, 1),
+            "bytes_per_frame": raw_bytes / max(frames, 1),
+            "publisher_cpu_us_per_frame": cpu / max(frames, 1) * 1e6}
+
+
+def run_setting(spec, delay_ms, args):
+    port = free_port()
+    relay = start_relay(port)
+    uri = f"ws://127.0.0.1:{port}"
+    out = mp.Queue()
+    sub = mp.Process(target=subscriber_worker, args=(uri, 1, args.warmup, args.duration, out))
+    sub.start()
+    try:
+        time.sleep(1.0)  # subscriber connects first
+        result = asyncio.run(publish(uri, spec, delay_ms / 1000, args.rate,
+                                     args.warmup + args.duration + 0.5))
+        client = out.get()[0]
+        sub.join()
+    finally:
+        relay.terminate()
+        relay.wait()
+    result.update({
+        "compression": spec,
+        "batch_delay_ms": delay_ms,
+        "latency_p50_ms": client["p50"] * 1000,
+        "latency_p99_ms": client["p99"] * 1000,
+        "delivered": client["received"],
+    })
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rate", type=float, default=200.0, help="frames per second published")
+    ap.add_argument("--delays", type=float, nargs="+", default=[0, 5, 20, 50], help="batch budgets in ms")
+    ap.add_argument("--compression", nargs="+", default=["none", "deflate", "deflate:1", "deflate:6:10"])
+    ap.add_argument("--warmup", type=float, default=1.0)
+    ap.add_argument("--duration", type=float, default=5.0)
+    ap.add_argument("--output", default=os.path.join("benchmarks", "results", "batching.json"))
+    args = ap.parse_args(argv)
+
+    results = []
+    for spec in args.compression:
+        for delay in args.delays:
+            r = run_setting(spec, delay, args)
+            results.append(r)
+            print(f"[BATCH] {spec:<13} delay={delay:>4.0f}ms  {r['frames_per_s']:>7.0f} frames/s  "
+                  f"{r['frames_per_message']:>5.1f} frames/msg  cpu={r['publisher_cpu_us_per_frame']:>6.1f}us/frame  "
+                  f"p50={r['latency_p50_ms']:.1f}ms p99={r['latency_p99_ms']:.1f}ms")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"args": vars(args), "results": results}, f, indent=2)
+    print(f"[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
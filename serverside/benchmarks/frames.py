@@ -0,0 +1,104 @@
+"""Synthetic TI mmWave UART frames matching the layouts the parsers expect."""
+import math
+import random
+import struct
+
+MAGIC_WORD = bytes([2, 1, 4, 3, 6, 5, 8, 7])
+HEADER = struct.Struct('<8sIIIIIIII')
+TLV_HEADER = struct.Struct('<II')
+# rangeBinIndexMax, rangeBinIndexPhase, maxVal, processingCyclesOut,
+# rangeBinStartIndex, rangeBinEndIndex, 18 float outputs, 10 reserved floats
+VITALSIGN = struct.Struct('<HHfIHH28f')
+
+MSG_DETECTED_POINTS = 1
+MSG_RANGE_PROFILE = 2
+MSG_VITALSIGN = 6
+PAD = 32
+
+
+def _frame(frame_number, tlvs, num_detected_obj=0):
+    body = b''.join(TLV_HEADER.pack(t, len(payload)) + payload for t, payload in tlvs)
+    total = HEADER.size + len(body)
+    total += -total % PAD
+    header = HEADER.pack(MAGIC_WORD, 0x03050004, total, 0xA6843, frame_number,
+                         0, num_detected_obj, len(tlvs), 0)
+    return (header + body).ljust(total, b'\0')
+
+
+def vitals_frame(frame_number, num_bins=23, bin_start=11):
+    """Vital signs lab frame: TLV 6 (128-byte stats) + TLV 2 (range profile)."""
+    t = frame_number * 0.05
+    breath = math.sin(2 * math.pi * 0.27 * t)
+    heart = math.sin(2 * math.pi * 1.25 * t)
+    outputs = [
+        2.5 + 1.5 * breath,     # unwrapPhasePeak_mm
+        breath,                 # outputFilterBreathOut
+        heart,                  # outputFilterHeartOut
+        75.0, 150.0, 74.0, 76.0,    # heart rate estimates
+        16.0, 15.5, 16.5,           # breathing rate estimates
+        0.9, 0.8, 0.7, 0.6, 0.5,    # confidence metrics
+        1.2e6, 800.0,               # energy breath/heart
+        0.0,                        # motionDetectedFlag
+    ]
+    stats = VITALSIGN.pack(bin_start + num_bins // 2, bin_start + num_bins // 2, 1000.0, 12345,
+                           bin_start, bin_start + num_bins - 1, *outputs, *([0.0] * 10))
+    profile = b''.join(struct.pack('>hh', 100 + i * 10, 50 + i) for i in range(num_bins))
+    return _frame(frame_number, [(MSG_VITALSIGN, stats), (MSG_RANGE_PROFILE, profile)])
+
+
+def points_frame(frame_number, num_points=32):
+    """Out-of-box demo frame: TLV 1 with num_points x (x, y, z, velocity) float32."""
+    coords = []
+    for i in range(num_points):
+        angle = 2 * math.pi * i / max(num_points, 1)
+        coords += [math.cos(angle), 1.0 + 0.01 * i, math.sin(angle) * 0.2, 0.05 * math.sin(frame_number * 0.1)]
+    points = struct.pack(f'<{len(coords)}f', *coords)
+    return _frame(frame_number, [(MSG_DETECTED_POINTS, points)], num_detected_obj=num_points)
+
+
+def people_frame(frame_number, people=3, points_per_person=100, noise_points=20):
+    """
+    TLV 1 point cloud of several people walking slowly across the room plus
+    scattered clutter; deterministic per frame_number.
+    """
+    rng = random.Random(frame_number)
+    t = frame_number * 0.05
+    coords = []
+    for p in range(people):
+        cx = -1.5 + 1.5 * p + 0.3 * math.sin(0.2 * t + p)
+        cy = 2.0 + 0.5 * p + 0.2 * math.cos(0.15 * t + p)
+        for _ in range(points_per_person):
+            coords += [rng.gauss(cx, 0.12), rng.gauss(cy, 0.12), rng.gauss(1.0, 0.3), rng.gauss(0.0, 0.1)]
+    for _ in range(noise_points):
+        coords += [rng.uniform(-4, 4), rng.uniform(0.5, 6), rng.uniform(0, 2), 0.0]
+    points = struct.pack(f'<{len(coords)}f', *coords)
+    return _frame(frame_number, [(MSG_DETECTED_POINTS, points)], num_detected_obj=len(coords) // 4)
+
+
+def stream(make_frame, num_frames, start=0, **kwargs):
+    return b''.join(make_frame(start + n, **kwargs) for n in range(num_frames))
+
+
+class FakeSerial:
+    """Replays a byte stream in UART-sized chunks through the pyserial read API."""
+
+    def __init__(self, data, chunk=256):
+        self.data = data
+        self.chunk = chunk
+        self.pos = 0
+
+    @property
+    def in_waiting(self):
+        return min(self.chunk, len(self.data) - self.pos)
+
+    def read(self, size=1):
+        out = self.data[self.pos:self.pos + size]
+        self.pos += len(out)
+        return out
+
+    def rewind(self):
+        self.pos = 0
+
+    @property
+    def exhausted(self):
+        return self.pos >= len(self.data)
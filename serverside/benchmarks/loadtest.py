@@ -0,0 +1,272 @@
+"""
+Relay capacity test: K simulated publishers and M subscribers against server.py on loopback.
+
+    python -m benchmarks.loadtest --publishers 1 4 --subscribers 10 100 300
+    python -m benchmarks.loadtest --capture session.bin --publishers 2 --subscribers 50
+
+Every (K, M) point starts a fresh relay process, runs for --duration seconds
+after --warmup, and records delivered msgs/s, per-client latency percentiles
+and the relay's CPU and RSS. The resulting capacity curve is written as JSON.
+Subscribers are spread over --subscriber-procs processes so the clients are
+not the bottleneck; the load generator still shares the machine with the relay.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from mmvs.trace import percentile  # noqa: E402
+
+
+class ProcessSampler:
+    """CPU seconds and RSS of a process and its children (relay workers), from /proc or psutil."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        try:
+            import psutil
+            self.proc = psutil.Process(pid)
+        except ImportError:
+            self.proc = None
+        self.ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def _procs(self):
+        if self.proc:
+            return [self.proc] + self.proc.children(recursive=True)
+        try:
+            with open(f"/proc/{self.pid}/task/{self.pid}/children") as f:
+                return [self.pid] + [int(p) for p in f.read().split()]
+        except OSError:
+            return [self.pid]
+
+    def cpu_seconds(self):
+        total = 0.0
+        for proc in self._procs():
+            if self.proc:
+                t = proc.cpu_times()
+                total += t.user + t.system
+                continue
+            with open(f"/proc/{proc}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / self.ticks
+        return total
+
+    def rss_mb(self):
+        total = 0.0
+        for proc in self._procs():
+            if self.proc:
+                total += proc.memory_info().rss / 2 ** 20
+                continue
+            with open(f"/proc/{proc}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) / 1024
+        return total
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_relay(port, workers=1):
+    env = dict(os.environ, PORT=str(port), RELAY_WORKERS=str(workers))
+    env.pop("RELAY_METRICS_PORT", None)
+    relay = subprocess.Popen([sys.executable, "server.py"], env=env,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return relay
+        except OSError:
+            time.sleep(0.05)
+    relay.kill()
+    raise RuntimeError("relay did not start")
+
+
+# ---------------------------------------------------------------- publishers
+
+def frame_source(capture):
+    """Yields VitalsFrames from DummySensor or, with a capture, from recorded UART bytes."""
+    if not capture:
+        from mmvs.source import DummySensor
+        sensor = DummySensor()
+        while True:
+            yield sensor.get_data()
+
+    from mmvs.parser import DataParser
+    with open(capture, "rb") as f:
+        data = f.read()
+    while True:
+        parser = DataParser()
+        for i in range(0, len(data), 256):
+            frame = parser.parse_stream(data[i:i + 256])
+            if frame:
+                yield frame
+
+
+async def publisher(uri, sensor_id, fps, capture, stop):
+    import websockets
+    source = frame_source(capture)
+    period = 1.0 / fps
+    async with websockets.connect(uri) as ws:
+        seq = 0
+        next_send = time.monotonic()
+        while not stop.is_set():
+            data = next(source)
+            data.ts = time.time()
+            data.seq = seq
+            data.sensor = sensor_id
+            seq += 1
+            await ws.send(data.to_json())
+            next_send += period
+            await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+
+
+# ---------------------------------------------------------------- subscribers
+
+async def _subscribers(uri, count, warmup, duration):
+    import websockets
+    clients = [await websockets.connect(uri, max_queue=None) for _ in range(count)]
+    start = time.monotonic() + warmup
+    end = start + duration
+
+    async def consume(ws):
+        latencies = []
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            now = time.time()
+            if time.monotonic() >= start:
+                latencies.append(now - json.loads(message)["ts"])
+        return latencies
+
+    results = await asyncio.gather(*(consume(ws) for ws in clients))
+    for ws in clients:
+        await ws.close()
+    return results
+
+
+def subscriber_worker(uri, count, warmup, duration, out):
+    per_client = asyncio.run(_subscribers(uri, count, warmup, duration))
+    summaries = []
+    for latencies in per_client:
+        latencies.sort()
+        summaries.append({
+            "received": len(latencies),
+            "p50": percentile(latencies, 0.50),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else 0.0,
+        })
+    out.put(summaries)
+
+
+# ---------------------------------------------------------------- driver
+
+async def run_point(uri, publishers, subscribers, args, relay):
+    sampler = ProcessSampler(relay.pid)
+    out = mp.Queue()
+    procs = []
+    per_proc = [subscribers // args.subscriber_procs] * args.subscriber_procs
+    for i in range(subscribers % args.subscriber_procs):
+        per_proc[i] += 1
+    for count in per_proc:
+        if count:
+            p = mp.Process(target=subscriber_worker, args=(uri, count, args.warmup, args.duration, out))
+            p.start()
+            procs.append(p)
+
+    await asyncio.sleep(1.0)  # let subscribers connect before frames flow
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(publisher(uri, f"load-{i}", args.fps, args.capture, stop))
+             for i in range(publishers)]
+
+    await asyncio.sleep(args.warmup)
+    cpu0, rss0, t0 = sampler.cpu_seconds(), sampler.rss_mb(), time.monotonic()
+    await asyncio.sleep(args.duration)
+    cpu1, rss1, t1 = sampler.cpu_seconds(), sampler.rss_mb(), time.monotonic()
+
+    clients = []
+    loop = asyncio.get_running_loop()
+    for _ in procs:
+        clients += await loop.run_in_executor(None, out.get)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for p in procs:
+        p.join()
+
+    received = sum(c["received"] for c in clients)
+    p50s = sorted(c["p50"] for c in clients)
+    p99s = sorted(c["p99"] for c in clients)
+    return {
+        "publishers": publishers,
+        "subscribers": subscribers,
+        "offered_msgs_per_s": publishers * args.fps * subscribers,
+        "delivered_msgs_per_s": received / args.duration,
+        "delivery_ratio": received / max(1.0, publishers * args.fps * subscribers * args.duration),
+        "latency_ms": {
+            "median_client_p50": percentile(p50s, 0.5) * 1000,
+            "median_client_p99": percentile(p99s, 0.5) * 1000,
+            "worst_client_p99": (p99s[-1] if p99s else 0.0) * 1000,
+            "worst_max": max((c["max"] for c in clients), default=0.0) * 1000,
+        },
+        "relay_workers": args.relay_workers,
+        "relay_cpu_pct": 100 * (cpu1 - cpu0) / (t1 - t0),
+        "relay_rss_mb": max(rss0, rss1),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--publishers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--subscribers", type=int, nargs="+", default=[10, 50, 100, 200, 400])
+    ap.add_argument("--fps", type=float, default=20.0, help="frames per second per publisher")
+    ap.add_argument("--capture", help="raw UART capture to replay instead of DummySensor")
+    ap.add_argument("--warmup", type=float, default=2.0)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--relay-workers", type=int, default=1, help="RELAY_WORKERS for server.py")
+    ap.add_argument("--subscriber-procs", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    ap.add_argument("--output", default=os.path.join("benchmarks", "results", "capacity.json"))
+    args = ap.parse_args(argv)
+
+    curve = []
+    for k in args.publishers:
+        for m in args.subscribers:
+            port = free_port()
+            relay = start_relay(port, args.relay_workers)
+            try:
+                point = asyncio.run(run_point(f"ws://127.0.0.1:{port}", k, m, args, relay))
+            finally:
+                relay.terminate()
+                relay.wait()
+            curve.append(point)
+            lat = point["latency_ms"]
+            print(f"[LOAD] K={k:<3} M={m:<4} delivered={point['delivered_msgs_per_s']:>9,.0f}/s "
+                  f"({point['delivery_ratio']:.1%}) p50={lat['median_client_p50']:.1f}ms "
+                  f"p99={lat['median_client_p99']:.1f}ms worst p99={lat['worst_client_p99']:.1f}ms "
+                  f"cpu={point['relay_cpu_pct']:.0f}% rss={point['relay_rss_mb']:.0f}MB")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"args": vars(args), "curve": curve}, f, indent=2)
+    print(f"[INFO] Capacity curve written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Serverside pipeline benchmarks on synthetic frames; no sensor hardware needed.
+
+    python -m benchmarks.run                       # all benchmarks
+    python -m benchmarks.run --only sync relay     # name prefixes
+    python -m benchmarks.run --compare benchmarks/results/baseline.json
+
+Results are written as JSON (default benchmarks/results/latest.json). With
+--compare, any benchmark whose throughput dropped by more than --tolerance
+is reported and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import struct
+import subprocess
+import sys
+import time
+from array import array
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # profiles/ paths are relative to serverside/
+
+from benchmarks.frames import FakeSerial, people_frame, points_frame, stream, vitals_frame  # noqa: E402
+
+PROFILE_PATH = 'profiles/xwr6843_profile_VitalSigns_20fps_Front.cfg'
+BENCHMARKS = []
+
+
+def bench(name):
+    def register(fn):
+        BENCHMARKS.append((name, fn))
+        return fn
+    return register
+
+
+class Skip(Exception):
+    pass
+
+
+def measure(run_once, ops_per_run, min_time):
+    """Repeats run_once until min_time elapses; returns throughput figures."""
+    runs = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time or runs == 0:
+        run_once()
+        runs += 1
+        elapsed = time.perf_counter() - start
+    ops = runs * ops_per_run
+    return {"ops": ops, "seconds": elapsed, "ops_per_s": ops / elapsed,
+            "us_per_op": elapsed / ops * 1e6}
+
+
+def decoded_frames(n):
+    from mmvs.config import load_profile
+    from mmvs.parser import DataParser
+    parser = DataParser(load_profile(PROFILE_PATH))
+    frames = []
+    for i in range(n):
+        frame = parser.parse_stream(vitals_frame(i))
+        if frame:
+            frames.append(frame)
+    return frames
+
+
+def binary_encode(frame):
+    """Reference compact encoding: scalar fields as float64 + float32 range profile."""
+    from mmvs.frame import FIELDS
+    scalars = [float(frame.get(k)) for k in FIELDS[:-1] if k in frame]
+    profile = array('f', frame.get("RangeProfile", ()))
+    return struct.pack(f'<H{len(scalars)}d', len(scalars), *scalars) + profile.tobytes()
+
+
+# ---------------------------------------------------------------- decode paths
+
+@bench("sync_decode.DataParser")
+def bench_data_parser(args):
+    from mmvs.config import load_profile
+    from mmvs.parser import DataParser
+    profile = load_profile(PROFILE_PATH)
+    port = FakeSerial(stream(vitals_frame, args.frames), chunk=args.chunk)
+
+    def run():
+        port.rewind()
+        parser = DataParser(profile)
+        while not port.exhausted:
+            parser.parse_stream(port.read(port.in_waiting))
+
+    return measure(run, args.frames, args.min_time)
+
+
+@bench("sync_decode.readAndParseData68xx")
+def bench_testapi_68xx(args):
+    try:
+        import testAPI
+    except ImportError as e:
+        raise Skip(f"testAPI import failed: {e}")
+    params = testAPI.profile.as_params()
+    port = FakeSerial(stream(vitals_frame, args.frames), chunk=args.chunk)
+
+    def run():
+        port.rewind()
+        testAPI.byteBuffer[:] = 0
+        testAPI.byteBufferLength = 0
+        while not port.exhausted:
+            testAPI.readAndParseData68xx(port, params)
+
+    return measure(run, args.frames, args.min_time)
+
+
+@bench("sync_decode.readAndParseData14xx")
+def bench_decoder_14xx(args):
+    import numpy as np
+    try:
+        from mmvs import decoder
+    except ImportError as e:
+        raise Skip(f"mmvs.decoder import failed: {e}")
+    data = stream(points_frame, args.frames, num_points=args.points)
+    port = FakeSerial(data, chunk=len(points_frame(0, num_points=args.points)))
+
+    def run():
+        port.rewind()
+        decoder.byteBuffer = np.zeros(2 ** 15, dtype='uint8')
+        decoder.byteBufferLength = 0
+        while not port.exhausted:
+            decoder.readAndParseData14xx(port, {})
+
+    return measure(run, args.frames, args.min_time)
+
+
+# ---------------------------------------------------------------- point cloud
+
+def _people_kwargs(args):
+    per_person = max(1, (args.cloud_points - 20) // args.people)
+    return {"people": args.people, "points_per_person": per_person, "noise_points": 20}
+
+
+def _realtime(result):
+    # Share of the 50 ms frame budget at 20 fps
+    result["budget_pct_20fps"] = result["us_per_op"] / 50000 * 100
+    return result
+
+
+@bench("point_cloud.decode")
+def bench_point_cloud_decode(args):
+    from mmvs.parser import DataParser
+    kwargs = _people_kwargs(args)
+    frame_len = len(people_frame(0, **kwargs))
+    port = FakeSerial(stream(people_frame, args.frames, **kwargs), chunk=frame_len)
+
+    def run():
+        port.rewind()
+        parser = DataParser()
+        while not port.exhausted:
+            parser.parse_stream(port.read(port.in_waiting))
+
+    result = measure(run, args.frames, args.min_time)
+    result["points_per_frame"] = kwargs["people"] * kwargs["points_per_person"] + kwargs["noise_points"]
+    return _realtime(result)
+
+
+@bench("point_cloud.track")
+def bench_point_cloud_track(args):
+    from mmvs.parser import DataParser
+    from mmvs.tracking import PersonTracker
+    parser = DataParser()
+    clouds = [parser.parse_stream(people_frame(i, **_people_kwargs(args))).points for i in range(200)]
+
+    def run():
+        tracker = PersonTracker()
+        for points in clouds:
+            tracker.update(points)
+
+    result = measure(run, len(clouds), args.min_time)
+    tracker = PersonTracker()
+    for points in clouds:
+        people = tracker.update(points)
+    result["people_tracked"] = len(people)
+    result["track_ids_issued"] = tracker.next_id - 1
+    return _realtime(result)
+
+
+# ---------------------------------------------------------------- encoders
+
+def published_frames(n):
+    """Decoded frames stamped the way testAPI sends them, config block included."""
+    from mmvs.config import load_profile
+    from mmvs.frame import json_members
+    config = json_members(config=load_profile(PROFILE_PATH).as_params())
+    frames = decoded_frames(n)
+    for seq, frame in enumerate(frames):
+        frame.ts = time.time()
+        frame.seq = seq
+        frame.sensor = "bench"
+        frame.extra = config
+    return frames
+
+
+def bench_encoder(encode, args):
+    from mmvs.config import load_profile
+    frames = published_frames(200)
+
+    def run():
+        for frame in frames:
+            encode(frame)
+
+    result = measure(run, len(frames), args.min_time)
+    result["bytes_per_frame"] = len(encode(frames[0]))
+    # Share of one core a single sensor spends encoding at its frame rate
+    result["cpu_pct_per_sensor"] = result["us_per_op"] * load_profile(PROFILE_PATH).fps / 1e4
+    return result
+
+
+@bench("encode.json")
+def bench_encode_json(args):
+    """Nested dict (config included) + json.dumps, the pre-VitalsFrame path."""
+    return bench_encoder(lambda frame: json.dumps(frame.as_dict()), args)
+
+
+@bench("encode.frame")
+def bench_encode_frame(args):
+    from mmvs.frame import VitalsFrame
+    return bench_encoder(VitalsFrame.to_json_std, args)
+
+
+@bench("encode.orjson")
+def bench_encode_orjson(args):
+    from mmvs import frame
+    if frame.orjson is None:
+        raise Skip("orjson is not installed")
+    return bench_encoder(frame.VitalsFrame.to_json_orjson, args)
+
+
+@bench("encode.binary")
+def bench_encode_binary(args):
+    frames = decoded_frames(200)
+
+    def run():
+        for frame in frames:
+            binary_encode(frame)
+
+    result = measure(run, len(frames), args.min_time)
+    result["bytes_per_frame"] = len(binary_encode(frames[0]))
+    return result
+
+
+# ---------------------------------------------------------------- relay
+
+async def _relay(clients, messages, make_messages):
+    import websockets
+    import server
+
+    async def handler(ws, path=None):
+        await server.handler(ws, path)
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as relay:
+        port = relay.sockets[0].getsockname()[1]
+        uri = f"ws://127.0.0.1:{port}"
+        subscribers = [await websockets.connect(uri, max_queue=None) for _ in range(clients)]
+        publisher = await websockets.connect(uri)
+        while len(server.CONNECTED_CLIENTS) < clients + 1:
+            await asyncio.sleep(0.01)
+
+        async def drain(ws):
+            for _ in range(messages):
+                await ws.recv()
+
+        start = time.perf_counter()
+        receivers = asyncio.gather(*(drain(ws) for ws in subscribers))
+        for payload in make_messages():
+            await publisher.send(payload)
+        await receivers
+        elapsed = time.perf_counter() - start
+
+        for ws in subscribers + [publisher]:
+            await ws.close()
+        while server.CONNECTED_CLIENTS:
+            await asyncio.sleep(0.01)
+        return elapsed
+
+
+def _relay_bench(args, make_messages, per_run):
+    try:
+        import websockets  # noqa: F401
+    except ImportError as e:
+        raise Skip(str(e))
+    results = {}
+    for clients in args.clients:
+        elapsed = asyncio.run(_relay(clients, per_run, make_messages))
+        results[f"clients_{clients}"] = {
+            "messages": per_run,
+            "seconds": elapsed,
+            "published_per_s": per_run / elapsed,
+            "delivered_per_s": per_run * clients / elapsed,
+        }
+    # Regression checks key off the largest fan-out
+    results["ops_per_s"] = results[f"clients_{max(args.clients)}"]["delivered_per_s"]
+    return results
+
+
+@bench("relay.fanout")
+def bench_relay_fanout(args):
+    payload = decoded_frames(1)[0].to_json()
+    return _relay_bench(args, lambda: (payload for _ in range(args.messages)), args.messages)
+
+
+@bench("end_to_end")
+def bench_end_to_end(args):
+    """Raw UART bytes -> DataParser -> JSON -> relay -> N subscribers."""
+    from mmvs.config import load_profile
+    from mmvs.parser import DataParser
+    data = stream(vitals_frame, args.messages)
+
+    def frames():
+        parser = DataParser(load_profile(PROFILE_PATH))
+        port = FakeSerial(data, chunk=args.chunk)
+        while not port.exhausted:
+            frame = parser.parse_stream(port.read(port.in_waiting))
+            if frame:
+                yield frame.to_json()
+        # Flush frames still buffered after the last read
+        while (frame := parser.parse_stream(b'')) is not None:
+            yield frame.to_json()
+
+    return _relay_bench(args, frames, args.messages)
+
+
+# ---------------------------------------------------------------- driver
+
+def environment():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                         stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": numpy_version,
+            "machine": platform.machine(), "processor": platform.processor(),
+            "system": platform.system(), "timestamp": time.time()}
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name, {}).get("ops_per_s")
+        new = result.get("ops_per_s")
+        if old and new and new < old * (1 - tolerance):
+            regressions.append(name)
+            print(f"[REGRESSION] {name}: {old:,.0f} -> {new:,.0f} ops/s ({new / old - 1:+.1%})")
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--only", nargs="*", default=[], help="run benchmarks whose name starts with these")
+    ap.add_argument("--frames", type=int, default=1000, help="frames per decode run")
+    ap.add_argument("--chunk", type=int, default=256, help="bytes per simulated UART read")
+    ap.add_argument("--points", type=int, default=64, help="detected points per 14xx frame")
+    ap.add_argument("--cloud-points", type=int, default=400, help="points per point_cloud.* frame")
+    ap.add_argument("--people", type=int, default=3, help="people in point_cloud.* frames")
+    ap.add_argument("--messages", type=int, default=2000, help="messages per relay run")
+    ap.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    ap.add_argument("--min-time", type=float, default=1.0, help="seconds per decode/encode benchmark")
+    ap.add_argument("--output", default=os.path.join("benchmarks", "results", "latest.json"))
+    ap.add_argument("--compare", help="baseline results JSON")
+    ap.add_argument("--tolerance", type=float, default=0.10)
+    args = ap.parse_args(argv)
+
+    results = {}
+    for name, fn in BENCHMARKS:
+        if args.only and not any(name.startswith(p) for p in args.only):
+            continue
+        try:
+            result = fn(args)
+        except Skip as e:
+            print(f"[SKIP] {name}: {e}")
+            continue
+        results[name] = result
+        print(f"[BENCH] {name}: {result['ops_per_s']:,.0f} ops/s")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "args": vars(args), "results": results}, f, indent=2)
+    print(f"[INFO] Results written to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Publisher cold start: import time and peak RSS of each entry point, one fresh interpreter per run.
+
+    python -m benchmarks.startup --repeat 5
+
+"legacy" is the import set mmvs.com/mmvs.decoder pulled in before they were
+trimmed (Qt, pyqtgraph, scikit-learn, pandas), for comparison with what the
+headless publisher loads today. Modules that fail to import here (not
+installed, or missing a dependency) are listed under "missing" and left out
+of that row, so only compare rows measured on the same machine.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = {
+    "baseline": [],
+    "legacy": ["serial", "numpy", "struct", "pyqtgraph", "pyqtgraph.Qt", "sklearn.cluster", "pandas"],
+    "main.dummy": ["main"],
+    "main.serial": ["main", "mmvs.connection", "mmvs.supervisor", "mmvs.parser"],
+    "testAPI": ["testAPI"],
+}
+
+PROBE = """
+import importlib, json, resource, sys, time
+t0 = time.perf_counter()
+missing = []
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except ImportError as e:
+        missing.append(name if e.name == name else f"{name} (needs {e.name})")
+elapsed = time.perf_counter() - t0
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss_kb //= 1024
+print(json.dumps({"seconds": elapsed, "rss_mb": rss_kb / 1024, "missing": missing}))
+"""
+
+
+def probe(modules):
+    out = subprocess.run([sys.executable, "-c", PROBE, *modules], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", nargs="*", default=list(ENTRY_POINTS), choices=list(ENTRY_POINTS))
+    ap.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "startup.json"))
+    args = ap.parse_args(argv)
+
+    results = {}
+    for name in args.only:
+        runs = [probe(ENTRY_POINTS[name]) for _ in range(args.repeat)]
+        results[name] = {
+            "import_s_median": statistics.median(r["seconds"] for r in runs),
+            "rss_mb_median": statistics.median(r["rss_mb"] for r in runs),
+            "missing": runs[0]["missing"],
+        }
+        r = results[name]
+        missing = f"  (failed: {', '.join(r['missing'])})" if r["missing"] else ""
+        print(f"[START] {name:<12} {r['import_s_median'] * 1000:>8.1f} ms  {r['rss_mb_median']:>7.1f} MB{missing}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"python": sys.version, "args": vars(args), "results": results}, f, indent=2)
+    print(f"[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,61 @@
 import asyncio
 import websockets
-import json
 import sys
 import platform
+import threading
+import time
+import traceback
 from mmvs.source import DummySensor, RealSensor
-from mmvs.config import SensorConfig
+from mmvs.frame import VitalsFrame
+from mmvs.config import load_profile
+from mmvs.metrics import METRICS
+from mmvs.batching import FrameBatcher, compression_options
+from mmvs.framequeue import FrameQueue
+from mmvs.spool import SpillQueue, spill, replay
 from dotenv import load_dotenv
 import os
 
 load_dotenv()  
 
 # --- CONFIGURATION ---
-USE_DUMMY_DATA = True
+SENSOR_SOURCE = os.getenv("SENSOR_SOURCE", "dummy")  # dummy | serial
+USE_DUMMY_DATA = SENSOR_SOURCE == "dummy"
+TRACK_PEOPLE = os.getenv("TRACK_PEOPLE", "0") == "1"  # cluster/track people in point-cloud frames
 IP = os.getenv("IP")
 PORT = os.getenv("PORT")
+METRICS_PORT = os.getenv("METRICS_PORT")  # serve /metrics when set
+SENSOR_ID = os.getenv("SENSOR_ID", platform.node())
+QUEUE_MAX = int(os.getenv("QUEUE_MAX", "1000"))
+QUEUE_POLICY = os.getenv("QUEUE_POLICY", "drop-oldest")  # drop-oldest | drop-newest | coalesce-latest
+READ_IDLE_S = 0.005  # reader poll interval when no frame is buffered
+# Frames produced while the relay is unreachable are spooled to disk and replayed on reconnect
+SPOOL_DIR = os.getenv("SPOOL_DIR", "spool")  # empty disables the spool
+SPOOL_MAX_MB = float(os.getenv("SPOOL_MAX_MB", "256"))
+
+# Batching: coalesce frames for up to BATCH_MAX_DELAY_MS (0 = one message per frame)
+BATCH_MAX_DELAY_MS = float(os.getenv("BATCH_MAX_DELAY_MS", "0"))
+BATCH_MAX_FRAMES = int(os.getenv("BATCH_MAX_FRAMES", "32"))
+# permessage-deflate for the relay link: "deflate" (default) or "none", plus optional tuning
+WS_COMPRESSION = compression_options(
+    os.getenv("WS_COMPRESSION", "deflate"),
+    level=os.getenv("WS_COMPRESSION_LEVEL"),
+    window_bits=os.getenv("WS_COMPRESSION_WINDOW_BITS"),
+    mem_level=os.getenv("WS_COMPRESSION_MEM_LEVEL"),
+)
 
 SERVER_URI = f"ws://{IP}:{PORT}"
 
 # ---------------------
 
 async def send_vital_signs():
+    if METRICS_PORT:
+        METRICS.serve(METRICS_PORT)
+
     if USE_DUMMY_DATA:
-        sensor = DummySensor()
+        sensor = DummySensor(realtime=True)
     else:
         # Load config real sensor
-        cfg = SensorConfig()
-        lines = cfg.parse_file("profiles/xwr6843_profile_VitalSigns_20fps_Front.cfg")
+        profile = load_profile("profiles/xwr6843_profile_VitalSigns_20fps_Front.cfg")
         
         # Cross-platform serial port configuration
         if platform.system() == "Windows":
@@ -35,28 +65,146 @@ async def send_vital_signs():
             cli_port = "/dev/ttyUSB0"
             data_port = "/dev/ttyUSB1"
         
-        sensor = RealSensor(lines, cli_port, data_port)
+        tracker = None
+        if TRACK_PEOPLE:
+            from mmvs.tracking import PersonTracker
+            tracker = PersonTracker(frame_period_s=profile.frame_periodicity_ms / 1000)
+
+        # Opening the ports and uploading the config can block for seconds; keep it off the event loop
+        sensor = await asyncio.to_thread(RealSensor, profile.commands, cli_port, data_port,
+                                         profile=profile, tracker=tracker)
         
-    print(f"[LAPTOP] Connecting to {SERVER_URI}...")
+    # Reading never waits on the relay: frames go through a bounded queue
+    frames = FrameQueue(maxsize=QUEUE_MAX, policy=QUEUE_POLICY)
+    METRICS.add_collector(frames.stats)
+    # Serial reads, reconnects and config re-uploads block, so they run on their own thread
+    stop_reading = threading.Event()
+    loop, main_task = asyncio.get_running_loop(), asyncio.current_task()
+    reader = threading.Thread(target=read_loop, name="sensor-reader", daemon=True,
+                              args=(sensor, frames, stop_reading,
+                                    lambda: loop.call_soon_threadsafe(main_task.cancel)))
+    reader.start()
+
+    spool = None
+    if SPOOL_DIR:
+        spool = SpillQueue(SPOOL_DIR, max_bytes=int(SPOOL_MAX_MB * 2 ** 20))
+        METRICS.add_collector(spool.stats)
+        if spool.pending:
+            print(f"[LAPTOP] {spool.pending} spooled frames will be replayed")
+
+    backoff = 1.0
     try:
-        async with websockets.connect(SERVER_URI) as websocket:
-            print("[LAPTOP] Connected! Sending data stream...")
-            
-            while True:
-                data = sensor.get_data()
-
-                if data:
-                    json_payload = json.dumps(data)
-                    await websocket.send(json_payload)                    
-                    print(f"\r[Sent] HR: {int(data.get('heartRateEst_FFT',0))} | BR: {int(data.get('breathingRateEst_FFT',0))}", end="")
-                await asyncio.sleep(0.05)
-
-    except ConnectionRefusedError:
-        print(f"\n[ERROR] Could not connect to server at {SERVER_URI}. Is server.py running?")
-    except KeyboardInterrupt:
+        while True:
+            print(f"[LAPTOP] Connecting to {SERVER_URI}...")
+            try:
+                async with websockets.connect(SERVER_URI, **WS_COMPRESSION) as websocket:
+                    print("[LAPTOP] Connected! Sending data stream...")
+                    backoff = 1.0
+                    await send_loop(websocket, frames, spool)
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                print(f"\n[ERROR] Relay at {SERVER_URI} unavailable ({e}). Retrying in {backoff:.1f}s")
+                METRICS.inc("reconnects")
+                await outage(frames, spool, backoff)
+                backoff = min(backoff * 1.5, 30.0)
+
+    except (KeyboardInterrupt, asyncio.CancelledError):
         print("\n[INFO] Stopping...")
     finally:
+        stop_reading.set()
+        reader.join(timeout=5)
         sensor.stop()
+        if spool:
+            spool.close()
+
+
+async def outage(frames, spool, seconds):
+    """Waits out a reconnect backoff, moving queued frames to the spool as they arrive."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if spool:
+            spill(frames, spool, VitalsFrame.to_json)
+        await asyncio.sleep(min(0.1, max(0.0, deadline - time.monotonic())))
+
+
+def read_available(sensor, limit=256):
+    """Every frame the sensor has ready, up to limit, without waiting for more."""
+    ready = []
+    while len(ready) < limit:
+        data = sensor.get_data()
+        if data is None:
+            break
+        ready.append(data)
+    return ready
+
+
+def read_loop(sensor, frames, stop, on_failure):
+    """
+    Reader thread: stamps and queues frames until stop is set. A publisher
+    without a reader would only send nothing, so a crash calls on_failure.
+    """
+    seq = 0
+    try:
+        while not stop.is_set():
+            ready = read_available(sensor)
+            for data in ready:
+                # Capture stamp and sequence number for end-to-end tracing
+                data.ts = time.time()
+                data.seq = seq
+                data.sensor = SENSOR_ID
+                seq += 1
+                frames.put(data)
+            if ready:
+                data = ready[-1]
+                print(f"\r[Sent] HR: {int(data.get('heartRateEst_FFT', 0))} | BR: {int(data.get('breathingRateEst_FFT', 0))}", end="")
+            else:
+                # Sleep only when nothing was buffered
+                stop.wait(READ_IDLE_S)
+    except Exception as exc:
+        print(f"\n[ERROR] Sensor reader stopped: {exc!r}")
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+        on_failure()
+
+
+async def send_loop(websocket, frames, spool=None):
+    batcher = FrameBatcher(BATCH_MAX_DELAY_MS / 1000, BATCH_MAX_FRAMES)
+    pending = []
+    while True:
+        if spool and spool.pending:
+            # Catch-up: live frames join the back of the spool so order holds,
+            # and the backlog drains as fast as the relay accepts it
+            spill(frames, spool, VitalsFrame.to_json)
+            with METRICS.time("ws_send"):
+                METRICS.inc("frames_replayed", await replay(spool, websocket.send))
+            continue
+
+        entry = frames.get_entry_nowait()
+        if entry is not None:
+            try:
+                with METRICS.time("serialize"):
+                    batcher.add(entry[1].to_json())
+                pending.append(entry)
+            except (TypeError, ValueError) as e:
+                # One frame that cannot be encoded is dropped; the batch it would join is kept
+                print(f"\n[ERROR] Dropping frame {entry[1].frame}: cannot encode ({e})")
+                METRICS.inc("frames_unencodable")
+
+        if batcher.due():
+            json_payload = batcher.flush()
+            try:
+                with METRICS.time("ws_send"):
+                    await websocket.send(json_payload)
+            except BaseException:
+                # Whatever failed the send, unsent frames go back to the head of the queue, in order
+                frames.requeue(pending)
+                raise
+            now = time.time()
+            for _, sent in pending:
+                METRICS.observe("publish_total", now - sent.ts)
+            pending = []
+            METRICS.inc("messages_sent")
+            METRICS.inc("bytes_sent", len(json_payload))
+        elif entry is None:
+            await asyncio.sleep(min(0.005, batcher.time_until_due() or 0.005))
 
 if __name__ == "__main__":
-    asyncio.run(send_vital_signs())
\ No newline at end of file
+    asyncio.run(send_vital_signs())
@@ -0,0 +1,84 @@
+import time
+
+# A batched websocket message is each frame prefixed with an ASCII record
+# separator (as in RFC 7464 JSON text sequences). JSON never contains a raw
+# control character, so the relay can split on it without decoding, and a
+# message that does not start with it is always passed through whole.
+BATCH_MARKER = "\x1e"
+
+
+def join_batch(messages):
+    """One websocket message for several encoded frames; a single frame is sent as-is."""
+    if len(messages) == 1:
+        return messages[0]
+    return BATCH_MARKER + BATCH_MARKER.join(messages)
+
+
+class FrameBatcher:
+    """
+    Coalesces encoded frames into one message, flushed when max_frames are
+    pending or the oldest pending frame has waited max_delay_s.
+    A max_delay_s of 0 disables batching: every frame is due at once.
+    """
+
+    def __init__(self, max_delay_s=0.02, max_frames=32):
+        self.max_delay_s = max_delay_s
+        self.max_frames = max_frames
+        self.pending = []
+        self.first_at = 0.0
+
+    def add(self, message):
+        if not self.pending:
+            self.first_at = time.monotonic()
+        self.pending.append(message)
+
+    def time_until_due(self):
+        """Seconds until the pending batch must be sent, or None when empty."""
+        if not self.pending:
+            return None
+        if len(self.pending) >= self.max_frames:
+            return 0.0
+        return max(0.0, self.first_at + self.max_delay_s - time.monotonic())
+
+    def due(self):
+        remaining = self.time_until_due()
+        return remaining is not None and remaining <= 0.0
+
+    def flush(self):
+        """Returns the batched message and clears it, or None when empty."""
+        if not self.pending:
+            return None
+        message = join_batch(self.pending)
+        self.pending = []
+        return message
+
+
+def split_batch(message):
+    """The frames of a join_batch() message; anything without the marker is one frame."""
+    if isinstance(message, str) and message[:1] == BATCH_MARKER:
+        return message[1:].split(BATCH_MARKER)
+    return [message]
+
+
+def compression_options(mode="deflate", level=None, window_bits=None, mem_level=None):
+    """
+    Keyword arguments for websockets.connect selecting permessage-deflate
+    settings for one link. mode "none" disables compression; leaving the
+    tuning values unset keeps the websockets defaults.
+    """
+    if mode in (None, "", "none", "off"):
+        return {"compression": None}
+    if level is None and window_bits is None and mem_level is None:
+        return {"compression": "deflate"}
+
+    from websockets.extensions.permessage_deflate import ClientPerMessageDeflateFactory
+    compress_settings = {}
+    if level is not None:
+        compress_settings["level"] = int(level)
+    if mem_level is not None:
+        compress_settings["memLevel"] = int(mem_level)
+    factory = ClientPerMessageDeflateFactory(
+        client_max_window_bits=int(window_bits) if window_bits is not None else True,
+        compress_settings=compress_settings,
+    )
+    return {"compression": "deflate", "extensions": [factory]}
@@ -0,0 +1,87 @@
+import asyncio
+import struct
+
+# Length-prefixed frames between relay workers: uint32 length, uint8 kind, payload
+FRAME_HEADER = struct.Struct('<IB')
+KIND_TEXT = 0
+KIND_BINARY = 1
+
+# A worker that falls this far behind stops receiving frames until it catches up
+MAX_PEER_BACKLOG = 4 * 2 ** 20
+
+
+def encode_frame(message):
+    if isinstance(message, str):
+        payload = message.encode()
+        return FRAME_HEADER.pack(len(payload), KIND_TEXT) + payload
+    return FRAME_HEADER.pack(len(message), KIND_BINARY) + message
+
+
+async def read_frame(reader):
+    """Returns (raw_frame, message) or raises asyncio.IncompleteReadError on EOF."""
+    header = await reader.readexactly(FRAME_HEADER.size)
+    length, kind = FRAME_HEADER.unpack(header)
+    payload = await reader.readexactly(length)
+    message = payload.decode() if kind == KIND_TEXT else payload
+    return header + payload, message
+
+
+class Broker:
+    """Runs in the parent process and forwards each worker's frames to every other worker."""
+
+    def __init__(self, path):
+        self.path = path
+        self.writers = set()
+        self.dropped = 0
+
+    async def serve(self):
+        server = await asyncio.start_unix_server(self._peer, path=self.path)
+        async with server:
+            await server.serve_forever()
+
+    async def _peer(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            while True:
+                raw, _ = await read_frame(reader)
+                for other in self.writers:
+                    if other is writer:
+                        continue
+                    if other.transport.get_write_buffer_size() > MAX_PEER_BACKLOG:
+                        self.dropped += 1
+                        continue
+                    other.write(raw)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+
+class PeerLink:
+    """A worker's connection to the Broker."""
+
+    def __init__(self, path, on_message):
+        self.path = path
+        self.on_message = on_message
+        self.writer = None
+
+    async def run(self, retry_delay=0.1):
+        while True:
+            try:
+                reader, self.writer = await asyncio.open_unix_connection(self.path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(retry_delay)
+                continue
+            try:
+                while True:
+                    _, message = await read_frame(reader)
+                    await self.on_message(message)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                print("[SERVER] Lost broker link, reconnecting...")
+            finally:
+                self.writer = None
+
+    def publish(self, message):
+        if self.writer is not None:
+            self.writer.write(encode_frame(message))
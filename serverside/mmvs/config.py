@@ -1,60 +1,195 @@
+import hashlib
 import math
+from dataclasses import dataclass
 
-class SensorConfig:
-    def __init__(self):
-        self.params = {}
+# Frame layout of the TI mmWave UART output (vital signs lab)
+FRAME_HEADER_LEN = 40           # magic(8) + 8 x uint32
+TLV_HEADER_LEN = 8              # type(4) + length(4)
+VITALSIGN_TLV_LEN = 128         # VitalSignsDemo_OutputStats
+RANGE_BIN_BYTES = 4             # int16 real + int16 imag
+POINT_BYTES = 16                # x, y, z, velocity as float32
+FRAME_PAD_BYTES = 32            # frames are padded to a multiple of this
+MAX_DETECTED_POINTS = 1024      # sizes max_frame_len for point-cloud profiles
+
+NUM_RX_ANT = 4
+NUM_TX_ANT = 2
+
+_PROFILE_CACHE = {}
+
+
+def _pad(length):
+    return int(math.ceil(length / FRAME_PAD_BYTES) * FRAME_PAD_BYTES)
+
+
+@dataclass(frozen=True)
+class SensorProfile:
+    """Immutable, fully derived view of an mmWave CLI configuration file."""
+    path: str
+    digest: str
+    commands: tuple
+
+    # Raw chirp / frame parameters
+    start_freq_ghz: float
+    idle_time_us: float
+    ramp_end_time_us: float
+    freq_slope_mhz_us: float
+    num_adc_samples: int
+    dig_out_sample_rate_ksps: int
+    num_chirps_per_frame: int
+    frame_periodicity_ms: float
+    range_start_m: float
+    range_end_m: float
+    point_cloud_enabled: bool
+
+    # Derived radar parameters
+    num_range_bins: int
+    num_doppler_bins: float
+    range_resolution_m: float
+    range_idx_to_m: float
+    doppler_resolution_mps: float
+    max_range_m: float
+    max_velocity_mps: float
+    fps: float
+
+    # Upper bound for a frame in bytes
+    max_frame_len: int
+
+    @classmethod
+    def from_lines(cls, config_lines, path="", digest=""):
+        params = {}
+        range_start = range_end = 0.0
+        frame_periodicity = 0.0
+        point_cloud = False
 
-    def parse_file(self, config_file_path):
-        """Parses the mmWave CLI configuration file."""
-        config_lines = []
-        
-        try:
-            with open(config_file_path, 'r') as f:
-                lines = f.readlines()
-                config_lines = [line.strip() for line in lines if line.strip()]
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Config file not found: {config_file_path}")
-
-        # Default values
-        numRxAnt = 4
-        numTxAnt = 2
-        
         for line in config_lines:
             split_words = line.split(" ")
             cmd = split_words[0]
 
             if "profileCfg" in cmd:
-                startFreq = float(split_words[2])
-                idleTime = float(split_words[3])
-                rampEndTime = float(split_words[5])
-                freqSlopeConst = float(split_words[8])
-                numAdcSamples = int(split_words[10])
-                digOutSampleRate = int(split_words[11])
-                
-                # Round to nearest power of 2
-                numAdcSamplesRoundTo2 = 1
-                while numAdcSamples > numAdcSamplesRoundTo2:
-                    numAdcSamplesRoundTo2 *= 2
-                    
+                params["start_freq_ghz"] = float(split_words[2])
+                params["idle_time_us"] = float(split_words[3])
+                params["ramp_end_time_us"] = float(split_words[5])
+                params["freq_slope_mhz_us"] = float(split_words[8])
+                params["num_adc_samples"] = int(split_words[10])
+                params["dig_out_sample_rate_ksps"] = int(split_words[11])
+
             elif "frameCfg" in cmd:
-                chirpStartIdx = int(split_words[1])
-                chirpEndIdx = int(split_words[2])
-                numLoops = int(split_words[3])
-                # numFrames = int(split_words[4])
-                # framePeriodicity = float(split_words[5])
+                chirp_start_idx = int(split_words[1])
+                chirp_end_idx = int(split_words[2])
+                num_loops = int(split_words[3])
+                params["num_chirps_per_frame"] = (chirp_end_idx - chirp_start_idx + 1) * num_loops
+                frame_periodicity = float(split_words[5])
 
             elif "vitalSignsCfg" in cmd:
-                rangeStart = float(split_words[1])
-                rangeEnd = float(split_words[2])
-
-        if 'profileCfg' in locals():
-            numChirpsPerFrame = (chirpEndIdx - chirpStartIdx + 1) * numLoops
-            self.params["numDopplerBins"] = numChirpsPerFrame / numTxAnt
-            self.params["numRangeBins"] = numAdcSamplesRoundTo2
-            self.params["rangeResolutionMeters"] = (3e8 * digOutSampleRate * 1e3) / (
-                    2 * freqSlopeConst * 1e12 * numAdcSamples)
-            self.params["maxRange"] = (300 * 0.9 * digOutSampleRate) / (2 * freqSlopeConst * 1e3)
-            self.params["rangeStart"] = rangeStart
-            self.params["rangeEnd"] = rangeEnd
-        
-        return config_lines
+                range_start = float(split_words[1])
+                range_end = float(split_words[2])
+
+            elif "guiMonitor" in cmd:
+                # SDK 3.x / out-of-box demos prepend subFrameIdx to the 6 flags;
+                # older and vital signs lab configs start with detectedObjects
+                args = split_words[1:]
+                point_cloud = (args[1] if len(args) >= 7 else args[0]) != "0"
+
+        missing = {"start_freq_ghz", "num_chirps_per_frame"} - params.keys()
+        if missing:
+            raise ValueError(f"Config is missing profileCfg/frameCfg: {path or '<lines>'}")
+
+        num_adc_samples = params["num_adc_samples"]
+        sample_rate = params["dig_out_sample_rate_ksps"]
+        slope = params["freq_slope_mhz_us"]
+        chirp_time = params["idle_time_us"] + params["ramp_end_time_us"]
+
+        # Round to nearest power of 2
+        num_range_bins = 1
+        while num_adc_samples > num_range_bins:
+            num_range_bins *= 2
+
+        num_doppler_bins = params["num_chirps_per_frame"] / NUM_TX_ANT
+        range_resolution = (3e8 * sample_rate * 1e3) / (2 * slope * 1e12 * num_adc_samples)
+        range_idx_to_m = (3e8 * sample_rate * 1e3) / (2 * slope * 1e12 * num_range_bins)
+        doppler_resolution = 3e8 / (
+                2 * params["start_freq_ghz"] * 1e9 * chirp_time * 1e-6 * num_doppler_bins * NUM_TX_ANT)
+        max_range = (300 * 0.9 * sample_rate) / (2 * slope * 1e3)
+        max_velocity = 3e8 / (4 * params["start_freq_ghz"] * 1e9 * chirp_time * 1e-6 * NUM_TX_ANT)
+
+        max_len = (FRAME_HEADER_LEN
+                   + TLV_HEADER_LEN + VITALSIGN_TLV_LEN
+                   + TLV_HEADER_LEN + num_range_bins * RANGE_BIN_BYTES)
+        if point_cloud:
+            max_len += TLV_HEADER_LEN + MAX_DETECTED_POINTS * POINT_BYTES
+
+        return cls(
+            path=path,
+            digest=digest,
+            commands=tuple(config_lines),
+            frame_periodicity_ms=frame_periodicity,
+            range_start_m=range_start,
+            range_end_m=range_end,
+            point_cloud_enabled=point_cloud,
+            num_range_bins=num_range_bins,
+            num_doppler_bins=num_doppler_bins,
+            range_resolution_m=range_resolution,
+            range_idx_to_m=range_idx_to_m,
+            doppler_resolution_mps=doppler_resolution,
+            max_range_m=max_range,
+            max_velocity_mps=max_velocity,
+            fps=1000.0 / frame_periodicity if frame_periodicity else 0.0,
+            max_frame_len=_pad(max_len),
+            **params,
+        )
+
+    def range_axis(self, bin_start, bin_end):
+        """
+        Distance in meters of each range-profile bin, for the window a frame
+        reports (rangeBinStartIndex..rangeBinEndIndex). The firmware spreads
+        that window over the vitalSignsCfg range, e.g. bins 11..33 for 0.3-0.9 m
+        with the shipped profile, so the bins are not range_idx_to_m apart.
+        """
+        if bin_end <= bin_start:
+            return (self.range_start_m,)
+        step = (self.range_end_m - self.range_start_m) / (bin_end - bin_start)
+        return tuple(self.range_start_m + i * step for i in range(bin_end - bin_start + 1))
+
+    def as_params(self):
+        """Legacy configParameters dictionary used by the older scripts."""
+        return {
+            "numDopplerBins": self.num_doppler_bins,
+            "numRangeBins": self.num_range_bins,
+            "rangeResolutionMeters": self.range_resolution_m,
+            "rangeIdxToMeters": self.range_idx_to_m,
+            "dopplerResolutionMps": self.doppler_resolution_mps,
+            "maxRange": self.max_range_m,
+            "maxVelocity": self.max_velocity_mps,
+            "rangeStart": self.range_start_m,
+            "rangeEnd": self.range_end_m,
+            "fps": self.fps,
+        }
+
+
+def load_profile(config_file_path):
+    """Parses a config file once; repeated loads of identical content hit the cache."""
+    try:
+        with open(config_file_path, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Config file not found: {config_file_path}")
+
+    digest = hashlib.sha256(raw).hexdigest()
+    profile = _PROFILE_CACHE.get(digest)
+    if profile is None:
+        lines = [line.strip() for line in raw.decode().splitlines() if line.strip()]
+        profile = SensorProfile.from_lines(lines, path=str(config_file_path), digest=digest)
+        _PROFILE_CACHE[digest] = profile
+    return profile
+
+
+class SensorConfig:
+    def __init__(self):
+        self.params = {}
+        self.profile = None
+
+    def parse_file(self, config_file_path):
+        """Parses the mmWave CLI configuration file."""
+        self.profile = load_profile(config_file_path)
+        self.params = self.profile.as_params()
+        return list(self.profile.commands)
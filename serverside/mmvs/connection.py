@@ -1,6 +1,6 @@
-import serial
 import time
-import sys
+import serial
+from .uploader import ConfigUploader
 
 class RadarConnection:
     def __init__(self, cli_port='/dev/ttyUSB0', data_port='/dev/ttyUSB1'):
@@ -8,28 +8,53 @@ class RadarConnection:
         self.data_port_name = data_port
         self.cli_serial = None
         self.data_serial = None
+        self.uploader = None
 
     def connect(self):
+        """Opens both ports. Returns False instead of raising so callers can retry."""
         try:
             # Standard baud rates for TI mmWave
             self.cli_serial = serial.Serial(self.cli_port_name, 115200)
             self.data_serial = serial.Serial(self.data_port_name, 921600)
             self.data_serial.reset_input_buffer()
+            self.uploader = ConfigUploader(self.cli_serial)
             print(f"[INFO] Connected to {self.cli_port_name} and {self.data_port_name}")
+            return True
         except serial.SerialException as e:
             print(f"[ERROR] Could not open serial ports: {e}")
-            sys.exit(1)
+            self.close()
+            return False
 
-    def send_configuration(self, config_lines):
-        """Sends the configuration commands line by line to the sensor."""
+    def send_configuration(self, config_lines, digest=None, force=False, probe_s=0.25):
+        """
+        Sends the configuration commands, waiting for the sensor to acknowledge each.
+        Unless force is set, the upload is skipped when this profile was the last
+        one the device acknowledged and the data port is already streaming.
+        """
         if not self.cli_serial:
-            return
+            return False
+
+        if not force and self.uploader.is_applied(digest) and self.is_streaming(probe_s):
+            print("[INFO] Sensor already running this profile, skipping upload.")
+            return True
 
         print("[INFO] Sending Configuration...")
-        for line in config_lines:
-            self.cli_serial.write((line + '\n').encode())
-            time.sleep(0.03) # Small delay to let sensor process
+        errors = self.uploader.upload(config_lines, digest=digest)
+        if errors:
+            print(f"[ERROR] Configuration incomplete: {len(errors)} command(s) failed.")
+            return False
         print("[INFO] Configuration Sent.")
+        return True
+
+    def is_streaming(self, wait_s):
+        """True if the data port receives bytes within wait_s; they stay queued for the next read."""
+        deadline = time.monotonic() + wait_s
+        while True:
+            if self.data_serial and self.data_serial.in_waiting > 0:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
 
     def read_into_buffer(self):
         """Reads all available bytes from data port."""
@@ -40,8 +65,14 @@ class RadarConnection:
     def stop_sensor(self):
         if self.cli_serial:
             self.cli_serial.write(('sensorStop\n').encode())
+            self.uploader.forget()
             print("[INFO] Sensor Stopped")
 
     def close(self):
-        if self.cli_serial: self.cli_serial.close()
-        if self.data_serial: self.data_serial.close()
+        for port in (self.cli_serial, self.data_serial):
+            try:
+                if port: port.close()
+            except (serial.SerialException, OSError):
+                pass
+        self.cli_serial = None
+        self.data_serial = None
@@ -1,11 +1,8 @@
-import serial
-import time
 import numpy as np
-import struct
-import pyqtgraph as pg
-from pyqtgraph.Qt import QtGui
-from sklearn.cluster import dbscan
-import pandas
+
+from .config import FRAME_HEADER_LEN, TLV_HEADER_LEN
+from .metrics import METRICS
+from .parser import MAGIC_BYTES, frame_is_valid
 
 def readAndParseData14xx(Dataport, configParameters):
     global byteBuffer, byteBufferLength
@@ -43,16 +40,34 @@ def readAndParseData14xx(Dataport, configParameters):
 
         if startIdx:
             if 0 < startIdx[0] < byteBufferLength:
-                byteBuffer[:byteBufferLength - startIdx[0]] = byteBuffer[startIdx[0]:byteBufferLength]
-                byteBuffer[byteBufferLength - startIdx[0]:] = np.zeros(len(byteBuffer[byteBufferLength - startIdx[0]:]),
-                                                                       dtype='uint8')
-                byteBufferLength = byteBufferLength - startIdx[0]
-            if byteBufferLength < 0:
-                byteBufferLength = 0
+                dropBytes(startIdx[0])
+                METRICS.inc("resyncs")
 
-            totalPacketLen = int.from_bytes(byteBuffer[12:12 + 4], byteorder='little')
+            if byteBufferLength < FRAME_HEADER_LEN:
+                return dataOK, frameNumber, detObj
 
-            if (byteBufferLength >= totalPacketLen) and (byteBufferLength != 0):
+            totalPacketLen = int.from_bytes(byteBuffer[12:12 + 4], byteorder='little')
+            numTLVs = int.from_bytes(byteBuffer[32:32 + 4], byteorder='little')
+
+            # corrupt header -> drop this magic word, resync on the next call
+            if totalPacketLen > maxBufferSize:
+                rejectFrame("frames_oversize")
+                return dataOK, frameNumber, detObj
+            if totalPacketLen < FRAME_HEADER_LEN or numTLVs > (totalPacketLen - FRAME_HEADER_LEN) // TLV_HEADER_LEN:
+                rejectFrame("frames_corrupt")
+                return dataOK, frameNumber, detObj
+
+            if byteBufferLength >= totalPacketLen:
+                # a magic word inside the frame means bytes were lost and the next frame already began
+                nextStart = byteBuffer[8:totalPacketLen].tobytes().find(MAGIC_BYTES)
+                if nextStart >= 0:
+                    METRICS.inc("frames_truncated")
+                    METRICS.inc("resyncs")
+                    dropBytes(8 + nextStart)
+                    return dataOK, frameNumber, detObj
+                if not frame_is_valid(byteBuffer, 0, totalPacketLen):
+                    rejectFrame("frames_corrupt")
+                    return dataOK, frameNumber, detObj
                 magicOK = 1
 
     if magicOK:
@@ -82,32 +97,35 @@ def readAndParseData14xx(Dataport, configParameters):
             idX += 4
             tlv_length = int.from_bytes(byteBuffer[idX:idX + 4], byteorder='little')
             idX += 4
+            tlvEnd = idX + tlv_length
 
             if tlv_type == MMWDEMO_UART_MSG_DETECTED_POINTS:
 
-                x = np.zeros(numDetectedObj, dtype=np.float32)
-                y = np.zeros(numDetectedObj, dtype=np.float32)
-                z = np.zeros(numDetectedObj, dtype=np.float32)
-                velocity = np.zeros(numDetectedObj, dtype=np.float32)
-
-                for objectNum in range(numDetectedObj):
-                    x[objectNum] = byteBuffer[idX:idX + 4].view(dtype=np.float32)
-                    idX += 4
-                    y[objectNum] = byteBuffer[idX:idX + 4].view(dtype=np.float32)
-                    idX += 4
-                    z[objectNum] = byteBuffer[idX:idX + 4].view(dtype=np.float32)
-                    idX += 4
-                    velocity[objectNum] = byteBuffer[idX:idX + 4].view(dtype=np.float32)
-                    idX += 4
-                detObj = {"numObj": numDetectedObj, "x": x, "y": y, "z": z, "velocity": velocity}
+                # One view over the TLV: rows of (x, y, z, velocity)
+                numPoints = min(numDetectedObj, tlv_length // pointLengthInBytes)
+                points = np.frombuffer(byteBuffer, dtype='<f4', count=numPoints * 4,
+                                       offset=idX).reshape(numPoints, 4).copy()
+                detObj = {"numObj": numPoints, "points": points,
+                          "x": points[:, 0], "y": points[:, 1], "z": points[:, 2], "velocity": points[:, 3]}
                 dataOK = 1
 
-        if 0 < idX < byteBufferLength:
-            shiftSize = totalPacketLen
-            byteBuffer[:byteBufferLength - shiftSize] = byteBuffer[shiftSize:byteBufferLength]
-            byteBuffer[byteBufferLength - shiftSize:] = np.zeros(len(byteBuffer[byteBufferLength - shiftSize:]),
-                                                                 dtype='uint8')
-            byteBufferLength = byteBufferLength - shiftSize
-            if byteBufferLength < 0:
-                byteBufferLength = 0
+            # Other TLVs are skipped by their (already bounds-checked) length
+            idX = tlvEnd
+
+        dropBytes(totalPacketLen)
     return dataOK, frameNumber, detObj
+
+
+def dropBytes(n):
+    global byteBuffer, byteBufferLength
+    n = min(n, byteBufferLength)
+    byteBuffer[:byteBufferLength - n] = byteBuffer[n:byteBufferLength]
+    byteBuffer[byteBufferLength - n:] = 0
+    byteBufferLength -= n
+
+
+def rejectFrame(counter):
+    # Skip this magic word; the next call resyncs on the following one
+    METRICS.inc(counter)
+    METRICS.inc("resyncs")
+    dropBytes(1)
@@ -0,0 +1,271 @@
+import json
+import math
+import os
+from functools import lru_cache
+from operator import attrgetter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson is used when installed unless MMVS_JSON=json
+USE_ORJSON = orjson is not None and os.getenv("MMVS_JSON", "orjson") != "json"
+
+# Vital sign TLV (type 6) fields in wire order; struct '<HHfIHH28f', the last 10 floats are reserved
+VITAL_FIELDS = (
+    "rangeBinIndexMax",
+    "rangeBinIndexPhase",
+    "maxVal",
+    "processingCyclesOut",
+    "rangeBinStartIndex",
+    "rangeBinEndIndex",
+    "unwrapPhasePeak_mm",
+    "outputFilterBreathOut",
+    "outputFilterHeartOut",
+    "heartRateEst_FFT",
+    "heartRateEst_FFT_4Hz",
+    "heartRateEst_xCorr",
+    "heartRateEst_peakCount",
+    "breathingRateEst_FFT",
+    "breathingRateEst_xCorr",
+    "breathingRateEst_peakCount",
+    "confidenceMetricBreathOut",
+    "confidenceMetricBreathOut_xCorr",
+    "confidenceMetricHeartOut",
+    "confidenceMetricHeartOut_4Hz",
+    "confidenceMetricHeartOut_xCorr",
+    "sumEnergyBreathWfm",
+    "sumEnergyHeartWfm",
+    "motionDetectedFlag",
+)
+# Everything that goes into the "vitals" object on the wire
+FIELDS = VITAL_FIELDS + ("numDetectedObj", "RangeProfile")
+
+_get_vitals = attrgetter(*VITAL_FIELDS)
+_VITALS_TEMPLATE = "{" + ",".join(f'"{name}":%r' for name in VITAL_FIELDS) + ',"numDetectedObj":%d,"RangeProfile":[%s]}'
+
+
+@lru_cache(maxsize=64)
+def _json_str(value):
+    return json.dumps(value)
+
+
+_PLAIN_NUMBERS = frozenset((float, int))
+
+
+def _json_num(value):
+    # JSON has no NaN/Infinity and the frontend reads null as 0; numpy scalars
+    # become Python numbers first, since their repr is not JSON
+    if value is None:
+        return "null"
+    if type(value) not in _PLAIN_NUMBERS and hasattr(value, "item"):
+        value = value.item()
+    if not math.isfinite(value):
+        return "null"
+    return repr(value)
+
+
+def json_members(**fields):
+    """
+    Pre-serializes top-level members that do not change between frames (e.g. the
+    sensor config) into a fragment for VitalsFrame.extra, so they are encoded once.
+    """
+    return json.dumps(fields, separators=(",", ":"))[1:-1]
+
+
+def _json_array(values):
+    # tolist() turns numpy/array.array items into plain floats, whose repr is valid JSON
+    if hasattr(values, "tolist"):
+        values = values.tolist()
+    text = ",".join(map(repr, values))
+    # Plain finite numbers never contain an "n"; nan, inf and numpy scalar reprs do
+    if "n" in text:
+        text = ",".join(map(_json_num, values))
+    return text
+
+
+class VitalsFrame:
+    """
+    One decoded sensor frame.
+
+    Slots are named after the JSON keys the frontend reads, so a frame
+    serializes straight to {"ts", "seq", "sensor", "frame", "vitals": {...}}
+    without building an intermediate dict. RangeProfile is a numeric array
+    (numpy or array.array), not a list of boxed floats. Fields the sensor did
+    not report stay None and are left out of the message. extra holds a
+    json_members() fragment appended to the top-level object as-is.
+
+    points is the raw (N, 4) float32 point cloud (x, y, z, velocity) and stays
+    local; targets, the people a PersonTracker found in it, is sent as a
+    top-level list when set.
+
+    raw holds the payloads of TLVs a DataParser kept undecoded (lazy_tlvs),
+    keyed by TLV type. Reading one of their fields through get(), [] or
+    decode() decodes it once; serialization decodes only those that feed the
+    message.
+
+    get(), [] and `in` accept the JSON key names so dict-style callers keep working.
+    """
+
+    __slots__ = ("frame", "ts", "seq", "sensor", "extra", "points", "targets", "raw") + FIELDS
+
+    def __init__(self, frame=0, **fields):
+        self.frame = frame
+        self.ts = self.seq = self.sensor = self.extra = self.points = self.targets = self.raw = None
+        for name in FIELDS:
+            setattr(self, name, None)
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def set_vitals(self, values):
+        """Assigns VITAL_FIELDS in wire order from an unpacked TLV."""
+        for name, value in zip(VITAL_FIELDS, values):
+            setattr(self, name, value)
+
+    # ------------------------------------------------------------ lazy TLVs
+
+    def keep_raw(self, tlv_type, payload):
+        """Stores an undecoded TLV payload for decode() to pick up later."""
+        if self.raw is None:
+            self.raw = {}
+        self.raw[tlv_type] = payload
+
+    def decode(self, name):
+        """Decodes the pending TLV that provides field name (or the TLV called name), if any."""
+        if not self.raw:
+            return
+        from .tlv import FIELD_TLVS, TLV_HANDLERS
+        tlv_type = FIELD_TLVS.get(name)
+        if tlv_type is None:
+            tlv_type = next((t for t, h in TLV_HANDLERS.items() if h.name == name), None)
+        payload = self.raw.pop(tlv_type, None)
+        if payload is not None:
+            TLV_HANDLERS[tlv_type].decode(self, payload, 0, len(payload))
+
+    def _decode_serialized(self):
+        from .tlv import TLV_HANDLERS
+        for tlv_type in list(self.raw):
+            if not _SERIALIZED.isdisjoint(TLV_HANDLERS[tlv_type].fields):
+                payload = self.raw.pop(tlv_type)
+                TLV_HANDLERS[tlv_type].decode(self, payload, 0, len(payload))
+
+    # ------------------------------------------------------------ dict-style access
+
+    def get(self, name, default=None):
+        if name not in _SLOTS:
+            return default
+        value = getattr(self, name)
+        if value is None and self.raw:
+            self.decode(name)
+            value = getattr(self, name)
+        return default if value is None else value
+
+    def __getitem__(self, name):
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        if name not in _SLOTS:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def update(self, other):
+        """Copies every field other has set, so the newest value of each field wins."""
+        for name in self.__slots__:
+            value = getattr(other, name)
+            if value is not None and name != "raw":
+                setattr(self, name, value)
+        if other.raw:
+            # A newer undecoded TLV replaces whatever this frame decoded from the older one
+            from .tlv import TLV_HANDLERS
+            for tlv_type, payload in other.raw.items():
+                for name in TLV_HANDLERS[tlv_type].fields:
+                    if getattr(other, name) is None:
+                        setattr(self, name, None)
+                self.keep_raw(tlv_type, payload)
+
+    def as_dict(self):
+        """The nested dict this frame serializes to."""
+        if self.raw:
+            self._decode_serialized()
+        out = {name: getattr(self, name) for name in ("ts", "seq", "sensor") if getattr(self, name) is not None}
+        out["frame"] = self.frame
+        vitals = {name: getattr(self, name) for name in FIELDS if getattr(self, name) is not None}
+        if "RangeProfile" in vitals:
+            profile = vitals["RangeProfile"]
+            vitals["RangeProfile"] = profile.tolist() if hasattr(profile, "tolist") else list(profile)
+        out["vitals"] = vitals
+        if self.targets is not None:
+            out["targets"] = self.targets
+        if self.extra:
+            out.update(json.loads("{" + self.extra + "}"))
+        return out
+
+    # ------------------------------------------------------------ serialization
+
+    def to_json_std(self):
+        if self.raw:
+            self._decode_serialized()
+        head = ""
+        if self.ts is not None:
+            head += f'"ts":{_json_num(self.ts)},'
+        if self.seq is not None:
+            head += f'"seq":{self.seq},'
+        if self.sensor is not None:
+            head += f'"sensor":{_json_str(self.sensor)},'
+        extra = "," + self.extra if self.extra else ""
+        if self.targets is not None:
+            extra = f',"targets":{json.dumps(self.targets)}' + extra
+        return f'{{{head}"frame":{self.frame},"vitals":{self._vitals_json()}{extra}}}'
+
+    def to_json_orjson(self):
+        # orjson writes numpy arrays natively and non-finite floats as null
+        if self.raw:
+            self._decode_serialized()
+        out = {name: getattr(self, name) for name in ("ts", "seq", "sensor") if getattr(self, name) is not None}
+        out["frame"] = self.frame
+        vitals = {}
+        for name in FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                vitals[name] = value
+        profile = vitals.get("RangeProfile")
+        if profile is not None and not hasattr(profile, "dtype"):
+            vitals["RangeProfile"] = profile.tolist() if hasattr(profile, "tolist") else list(profile)
+        out["vitals"] = vitals
+        if self.targets is not None:
+            out["targets"] = self.targets
+        text = orjson.dumps(out, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        if self.extra:
+            text = text[:-1] + "," + self.extra + "}"
+        return text
+
+    to_json = to_json_orjson if USE_ORJSON else to_json_std
+
+    def _vitals_json(self):
+        values = _get_vitals(self)
+        profile = self.RangeProfile
+        if None not in values and self.numDetectedObj is not None and profile is not None \
+                and _PLAIN_NUMBERS.issuperset(map(type, values)) and all(map(math.isfinite, values)):
+            # Fast path: every field present as a finite Python number, one template format
+            return _VITALS_TEMPLATE % (*values, self.numDetectedObj, _json_array(profile))
+        parts = [f'"{name}":{_json_num(value)}' for name, value in zip(VITAL_FIELDS, values) if value is not None]
+        if self.numDetectedObj is not None:
+            parts.append(f'"numDetectedObj":{_json_num(self.numDetectedObj)}')
+        if profile is not None:
+            parts.append(f'"RangeProfile":[{_json_array(profile)}]')
+        return "{" + ",".join(parts) + "}"
+
+    def __repr__(self):
+        return f"VitalsFrame(frame={self.frame}, hr={self.heartRateEst_FFT}, br={self.breathingRateEst_FFT})"
+
+
+_SLOTS = frozenset(VitalsFrame.__slots__)
+# Fields that end up in the JSON message, decoded from raw before serializing
+_SERIALIZED = frozenset(FIELDS + ("targets",))
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+COALESCE_LATEST = "coalesce-latest"
+POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE_LATEST)
+
+
+class FrameQueue:
+    """
+    Bounded FIFO between the sensor reader and the websocket sender.
+
+    When full, the policy decides what gives way:
+      drop-oldest      evict the oldest frame (freshest data wins)
+      drop-newest      reject the incoming frame (history wins)
+      coalesce-latest  merge the incoming VitalsFrame into the newest queued
+                       one, so every field keeps its latest value
+
+    Safe across threads (testAPI reads on one, sends on another): a lock
+    guards every change to the deque, since coalescing mutates the newest
+    frame in place, and the event only wakes a blocked get(). Consumers that
+    may fail to send take (enqueued_at, frame) entries with get_entry*() and
+    hand them back unchanged to requeue(), so order and frame age survive
+    reconnects.
+    """
+
+    def __init__(self, maxsize=1000, policy=DROP_OLDEST):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy {policy!r}, expected one of {POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = deque()  # (enqueue_monotonic, frame)
+        self.lock = threading.Lock()
+        self.not_empty = threading.Event()
+
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, frame):
+        """Adds a frame; returns False if the policy discarded it."""
+        with self.lock:
+            if len(self.items) >= self.maxsize:
+                if self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.policy == COALESCE_LATEST and hasattr(frame, "update") and self.items:
+                    _, newest = self.items[-1]
+                    if type(newest) is type(frame):
+                        newest.update(frame)
+                        self.coalesced += 1
+                        return True
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append((time.monotonic(), frame))
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.not_empty.set()
+        return True
+
+    def get_entry_nowait(self):
+        """Returns the oldest (enqueued_at, frame) entry or None."""
+        with self.lock:
+            if not self.items:
+                self.not_empty.clear()
+                return None
+            self.dequeued += 1
+            return self.items.popleft()
+
+    def get_entry(self, timeout=None):
+        """Blocks up to timeout seconds for an entry; returns None on timeout."""
+        entry = self.get_entry_nowait()
+        if entry is None and self.not_empty.wait(timeout):
+            entry = self.get_entry_nowait()
+        return entry
+
+    def get_nowait(self):
+        """Returns the oldest frame or None."""
+        entry = self.get_entry_nowait()
+        return entry[1] if entry else None
+
+    def get(self, timeout=None):
+        """Blocks up to timeout seconds for a frame; returns None on timeout."""
+        entry = self.get_entry(timeout)
+        return entry[1] if entry else None
+
+    def requeue(self, entries):
+        """
+        Puts unsent (enqueued_at, frame) entries back at the head, oldest first,
+        keeping their order and original enqueue times.
+        """
+        with self.lock:
+            self.items.extendleft(reversed(entries))
+            self.dequeued -= len(entries)
+            while len(self.items) > self.maxsize:
+                if self.policy == DROP_NEWEST:
+                    self.items.pop()
+                else:
+                    self.items.popleft()
+                self.dropped += 1
+            if self.items:
+                self.not_empty.set()
+
+    def age_of_oldest(self):
+        try:
+            return time.monotonic() - self.items[0][0]
+        except IndexError:
+            return 0.0
+
+    def stats(self):
+        return {
+            "queue_depth": len(self.items),
+            "queue_max_depth": self.max_depth,
+            "queue_enqueued": self.enqueued,
+            "queue_dequeued": self.dequeued,
+            "queue_dropped": self.dropped,
+            "queue_coalesced": self.coalesced,
+            "queue_oldest_age_s": self.age_of_oldest(),
+        }
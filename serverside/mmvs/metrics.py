@@ -0,0 +1,159 @@
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+# Upper bounds in seconds, 50us .. 1s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; quantiles resolve to a bucket upper bound."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class _Timer:
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.stage, perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Registry:
+    """Per-stage histograms and counters. When disabled every call is a no-op."""
+
+    def __init__(self, prefix="mmvs", enabled=False):
+        self.prefix = prefix
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+
+    def inc(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = Histogram()
+            hist.observe(seconds)
+
+    def time(self, stage):
+        """Context manager timing a pipeline stage."""
+        return _Timer(self, stage) if self.enabled else _NULL_TIMER
+
+    def add_collector(self, fn):
+        """fn() returns a {name: number} dict of gauges read at scrape time."""
+        self.collectors.append(fn)
+
+    def snapshot(self):
+        gauges = {}
+        for fn in self.collectors:
+            gauges.update(fn())
+        return {
+            "counters": dict(self.counters),
+            "gauges": gauges,
+            "stages": {
+                stage: {
+                    "count": h.count,
+                    "p50_ms": h.quantile(0.5) * 1000,
+                    "p99_ms": h.quantile(0.99) * 1000,
+                }
+                for stage, h in list(self.histograms.items())
+            },
+        }
+
+    def render_prometheus(self):
+        p = self.prefix
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines.append(f"{p}_{name}_total {value}")
+        for fn in self.collectors:
+            for name, value in sorted(fn().items()):
+                lines.append(f"# TYPE {p}_{name} gauge")
+                lines.append(f"{p}_{name} {value}")
+        if self.histograms:
+            lines.append(f"# TYPE {p}_stage_seconds histogram")
+        for stage, h in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, n in zip(h.buckets, h.counts):
+                cumulative += n
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {h.sum}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves /metrics in Prometheus text format from a daemon thread."""
+        self.enabled = True
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, int(port)), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"[INFO] Metrics on http://{host}:{port}/metrics")
+        return server
+
+
+# Process-wide registry; enabled by MMVS_METRICS=1 or by serving it
+METRICS = Registry(enabled=os.getenv("MMVS_METRICS") == "1")
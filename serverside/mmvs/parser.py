@@ -1,127 +1,208 @@
 import numpy as np
-import struct
+from time import perf_counter
+from .metrics import METRICS
+from .config import FRAME_HEADER_LEN, TLV_HEADER_LEN, VITALSIGN_TLV_LEN, RANGE_BIN_BYTES, POINT_BYTES
+from .frame import VitalsFrame
+from .tlv import TLV_HANDLERS, resolve, MMWDEMO_UART_MSG_DETECTED_POINTS, \
+    MMWDEMO_UART_MSG_RANGE_PROFILE, MMWDEMO_UART_MSG_VITALSIGN
+
+MAGIC_BYTES = bytes([2, 1, 4, 3, 6, 5, 8, 7])
 
 class DataParser:
-    def __init__(self):
+    """
+    tlvs names what gets decoded in every frame: TLV names ("vitals",
+    "range_profile", "points"), TLV types or VitalsFrame field names; None
+    decodes every registered TLV. lazy_tlvs are copied out as raw bytes and
+    only decoded when the frame is first asked for one of their fields. Any
+    other TLV is skipped by its length without reading its payload.
+    """
+
+    def __init__(self, profile=None, tlvs=None, lazy_tlvs=()):
         # Constants
         self.MAGIC_WORD = np.array([2, 1, 4, 3, 6, 5, 8, 7], dtype='uint8')
         self.MAX_BUFFER_SIZE = 2 ** 15
+
+        # Frame bounds from the sensor profile; without one only the buffer size limits a frame
+        self.profile = profile
+        self.max_frame_len = self.MAX_BUFFER_SIZE
+        if profile:
+            self.max_frame_len = profile.max_frame_len
+            self.MAX_BUFFER_SIZE = max(self.MAX_BUFFER_SIZE, 4 * profile.max_frame_len)
         
-        # Message Types
-        self.MMWDEMO_UART_MSG_DETECTED_POINTS = 1
-        self.MMWDEMO_UART_MSG_RANGE_PROFILE = 2
-        self.MMWDEMO_UART_MSG_VITALSIGN = 6
+        # TLV type -> decode function, for the TLVs consumers subscribed to
+        eager = set(TLV_HANDLERS) if tlvs is None else resolve(tlvs)
+        self.handlers = {t: TLV_HANDLERS[t].decode for t in eager}
+        self.lazy_tlvs = resolve(lazy_tlvs) - eager
 
         # Buffer State
         self.byte_buffer = np.zeros(self.MAX_BUFFER_SIZE, dtype='uint8')
         self.byte_buffer_len = 0
 
+    def reset(self):
+        """Drops any partial frame, e.g. after the serial link was reopened."""
+        self.byte_buffer_len = 0
+
     def parse_stream(self, raw_data):
         """
-        Ingests raw bytes, looks for frames, and returns a vitals dictionary if a frame is found.
+        Ingests raw bytes, looks for frames, and returns a VitalsFrame if a frame is found, else None.
+
+        Frame headers are checked before the parser waits on them: a length
+        above the profile's maximum (frames_oversize), a header whose TLV count
+        cannot fit its length or a frame whose TLVs overrun it (frames_corrupt),
+        and a frame cut short by the next magic word (frames_truncated) are
+        dropped at once and the parser resyncs on the next magic word.
         """
+        t0 = perf_counter()
         byte_vec = np.frombuffer(raw_data, dtype='uint8')
         byte_count = len(byte_vec)
+        METRICS.inc("bytes_in", byte_count)
         
         if (self.byte_buffer_len + byte_count) < self.MAX_BUFFER_SIZE:
             self.byte_buffer[self.byte_buffer_len:self.byte_buffer_len + byte_count] = byte_vec
             self.byte_buffer_len += byte_count
+        else:
+            METRICS.inc("bytes_dropped", byte_count)
 
-        if self.byte_buffer_len < 16:
-            return None
+        while self.byte_buffer_len >= 16:
+            possible_locs = np.where(self.byte_buffer[:self.byte_buffer_len] == self.MAGIC_WORD[0])[0]
+            start_idx = -1
 
-        possible_locs = np.where(self.byte_buffer == self.MAGIC_WORD[0])[0]
-        start_idx = -1
-        
-        for loc in possible_locs:
-            if loc + 8 > self.byte_buffer_len: break
-            check = self.byte_buffer[loc:loc + 8]
-            if np.all(check == self.MAGIC_WORD):
-                start_idx = loc
-                break
-
-        # Align Buffer
-        if start_idx >= 0:
+            for loc in possible_locs:
+                if loc + 8 > self.byte_buffer_len: break
+                check = self.byte_buffer[loc:loc + 8]
+                if np.all(check == self.MAGIC_WORD):
+                    start_idx = loc
+                    break
+
+            if start_idx < 0:
+                # No frame start anywhere: keep only what could be the beginning of
+                # a magic word, so line noise cannot fill the buffer
+                self._drop(self.byte_buffer_len - 7)
+                return None
+
+            # Align Buffer
             if start_idx > 0:
-                self.byte_buffer[:self.byte_buffer_len - start_idx] = self.byte_buffer[start_idx:self.byte_buffer_len]
-                self.byte_buffer_len -= start_idx
-            
-            if self.byte_buffer_len < 12 + 4: return None # Header incomplete
-            
+                self._drop(start_idx, counter=None)
+                METRICS.inc("resyncs")
+
+            if self.byte_buffer_len < FRAME_HEADER_LEN: return None # Header incomplete
+
             total_packet_len = int.from_bytes(self.byte_buffer[12:16], byteorder='little')
-            
-            if self.byte_buffer_len >= total_packet_len:
-                # We have a full frame! Process it.
+            num_tlvs = int.from_bytes(self.byte_buffer[32:36], byteorder='little')
+
+            if total_packet_len > self.max_frame_len:
+                self._reject("frames_oversize")
+                continue
+            if total_packet_len < FRAME_HEADER_LEN or num_tlvs > (total_packet_len - FRAME_HEADER_LEN) // TLV_HEADER_LEN:
+                self._reject("frames_corrupt")
+                continue
+
+            if self.byte_buffer_len < total_packet_len:
+                return None
+
+            # A magic word inside the frame means bytes were lost and the next frame already began
+            next_start = self.byte_buffer[8:total_packet_len].tobytes().find(MAGIC_BYTES)
+            if next_start >= 0:
+                METRICS.inc("frames_truncated")
+                self._drop(8 + next_start, counter=None)
+                METRICS.inc("resyncs")
+                continue
+            if not frame_is_valid(self.byte_buffer, 0, total_packet_len, self.profile):
+                self._reject("frames_corrupt")
+                continue
+
+            # We have a full frame! Process it.
+            METRICS.observe("frame_sync", perf_counter() - t0)
+            with METRICS.time("tlv_decode"):
                 frame_data = self._decode_frame(total_packet_len)
-                
-                self.byte_buffer[:self.byte_buffer_len - total_packet_len] = self.byte_buffer[total_packet_len:self.byte_buffer_len]
-                self.byte_buffer_len -= total_packet_len
-                
-                return frame_data
+            METRICS.inc("frames")
+            
+            self._drop(total_packet_len, counter=None)
+            return frame_data
         return None
 
+    def _reject(self, counter):
+        # Skip this magic word and resync on the next one
+        METRICS.inc(counter)
+        METRICS.inc("resyncs")
+        self._drop(1, counter=None)
+
+    def _drop(self, n, counter="bytes_dropped"):
+        if n <= 0:
+            return
+        self.byte_buffer[:self.byte_buffer_len - n] = self.byte_buffer[n:self.byte_buffer_len]
+        self.byte_buffer_len -= n
+        if counter:
+            METRICS.inc(counter, int(n))
+
     def _decode_frame(self, total_len):
-        idx = 0
-        idx += 8 
-        idx += 4 
-        idx += 4 
-        idx += 4 
-        frame_number = int.from_bytes(self.byte_buffer[idx:idx + 4], byteorder='little')
-        idx += 4
-        idx += 4 
-        num_detected_obj = int.from_bytes(self.byte_buffer[idx:idx + 4], byteorder='little')
+        return decode_frame(self.byte_buffer, 0, self.handlers, self.lazy_tlvs)
+
+
+def frame_is_valid(buf, start, total_len, profile=None):
+    """
+    Checks that the TLVs of the frame at buf[start] stay inside its total_len
+    bytes and that the known TLVs have lengths the sensor can produce. The
+    point cloud is bounded by the header's numDetectedObj, not a fixed cap.
+    """
+    num_detected_obj = int.from_bytes(buf[start + 28:start + 32], byteorder='little')
+    num_tlvs = int.from_bytes(buf[start + 32:start + 36], byteorder='little')
+    max_bins = profile.num_range_bins if profile else None
+    idx = start + FRAME_HEADER_LEN
+    end = start + total_len
+    for _ in range(num_tlvs):
+        if idx + TLV_HEADER_LEN > end:
+            return False
+        tlv_type = int.from_bytes(buf[idx:idx + 4], byteorder='little')
+        tlv_len = int.from_bytes(buf[idx + 4:idx + 8], byteorder='little')
+        idx += TLV_HEADER_LEN
+        if tlv_len > end - idx:
+            return False
+        if tlv_type == MMWDEMO_UART_MSG_VITALSIGN and tlv_len != VITALSIGN_TLV_LEN:
+            return False
+        if tlv_type == MMWDEMO_UART_MSG_RANGE_PROFILE and (
+                tlv_len % RANGE_BIN_BYTES or (max_bins and tlv_len > max_bins * RANGE_BIN_BYTES)):
+            return False
+        if tlv_type == MMWDEMO_UART_MSG_DETECTED_POINTS and (
+                tlv_len % POINT_BYTES or tlv_len > num_detected_obj * POINT_BYTES):
+            return False
+        idx += tlv_len
+    return True
+
+
+def decode_frame(buf, start, handlers, lazy_tlvs=()):
+    """
+    Decodes the frame whose magic word is at buf[start] (a numpy uint8 buffer,
+    bytes or mmap). handlers maps TLV type -> decode function; lazy_tlvs are
+    kept raw on the frame and any other TLV is skipped.
+    """
+    idx = start
+    idx += 8 
+    idx += 4 
+    idx += 4 
+    idx += 4 
+    frame_number = int.from_bytes(buf[idx:idx + 4], byteorder='little')
+    idx += 4
+    idx += 4 
+    num_detected_obj = int.from_bytes(buf[idx:idx + 4], byteorder='little')
+    idx += 4
+    num_tlvs = int.from_bytes(buf[idx:idx + 4], byteorder='little')
+    idx += 4
+    idx += 4 
+    vitals = VitalsFrame(frame_number, numDetectedObj=num_detected_obj)
+
+    for _ in range(num_tlvs):
+        tlv_type = int.from_bytes(buf[idx:idx + 4], byteorder='little')
         idx += 4
-        num_tlvs = int.from_bytes(self.byte_buffer[idx:idx + 4], byteorder='little')
+        tlv_len = int.from_bytes(buf[idx:idx + 4], byteorder='little')
         idx += 4
-        idx += 4 
-        vitals = {"frame": frame_number}
-
-        for _ in range(num_tlvs):
-            tlv_type = int.from_bytes(self.byte_buffer[idx:idx + 4], byteorder='little')
-            idx += 4
-            tlv_len = int.from_bytes(self.byte_buffer[idx:idx + 4], byteorder='little')
-            idx += 4
-            
-            if tlv_type == self.MMWDEMO_UART_MSG_VITALSIGN:
-                vitals.update(self._parse_vital_tlv(idx))
-            
-            elif tlv_type == self.MMWDEMO_UART_MSG_RANGE_PROFILE:
-                vitals["RangeProfile"] = self._parse_range_profile(idx, tlv_len)
-            
-            idx += tlv_len
-
-        return vitals
-
-    def _parse_vital_tlv(self, idx):
-        v = {}
-        # Parsing based on struct definition in docs/C code
-        v["rangeBinIndexMax"] = int.from_bytes(self.byte_buffer[idx:idx+2], byteorder='little')
-        v["rangeBinIndexPhase"] = int.from_bytes(self.byte_buffer[idx+2:idx+4], byteorder='little')
-        v["maxVal"] = struct.unpack('<f', self.byte_buffer[idx+4:idx+8])[0]
-        v["processingCyclesOut"] = int.from_bytes(self.byte_buffer[idx+8:idx+12], byteorder='little')
-        v["rangeBinStartIndex"] = int.from_bytes(self.byte_buffer[idx+12:idx+14], byteorder='little')
-        v["rangeBinEndIndex"] = int.from_bytes(self.byte_buffer[idx+14:idx+16], byteorder='little')
-        v["unwrapPhasePeak_mm"] = struct.unpack('<f', self.byte_buffer[idx+16:idx+20])[0]
-        v["outputFilterBreathOut"] = struct.unpack('<f', self.byte_buffer[idx+20:idx+24])[0]
-        v["outputFilterHeartOut"] = struct.unpack('<f', self.byte_buffer[idx+24:idx+28])[0]
-        v["heartRateEst_FFT"] = struct.unpack('<f', self.byte_buffer[idx+28:idx+32])[0]
-        v["heartRateEst_FFT_4Hz"] = struct.unpack('<f', self.byte_buffer[idx+32:idx+36])[0] / 2
-        v["heartRateEst_xCorr"] = struct.unpack('<f', self.byte_buffer[idx+36:idx+40])[0]        
-        v["breathingRateEst_FFT"] = struct.unpack('<f', self.byte_buffer[idx+44:idx+48])[0]
-        v["sumEnergyBreathWfm"] = struct.unpack('<f', self.byte_buffer[idx+76:idx+80])[0]
-        v["sumEnergyHeartWfm"] = struct.unpack('<f', self.byte_buffer[idx+80:idx+84])[0]
-        
-        return v
-
-    def _parse_range_profile(self, idx, length):
-        # Range profile is array of 16-bit complex numbers (Real(2) + Imag(2) = 4 bytes per bin)
-        num_bins = length // 4
-        profile = []
-        current = idx
-        for _ in range(num_bins):
-            real = int.from_bytes(self.byte_buffer[current:current+2], byteorder='big', signed=True) # Usually big endian for TI DSP data
-            current += 2
-            imag = int.from_bytes(self.byte_buffer[current:current+2], byteorder='big', signed=True)
-            current += 2
-            profile.append((real**2 + imag**2)**0.5)
-        return profile
\ No newline at end of file
+
+        decode = handlers.get(tlv_type)
+        if decode:
+            decode(vitals, buf, idx, tlv_len)
+        elif tlv_type in lazy_tlvs:
+            vitals.keep_raw(tlv_type, bytes(buf[idx:idx + tlv_len]))
+
+        idx += tlv_len
+
+    return vitals
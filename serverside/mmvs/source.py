@@ -2,14 +2,15 @@ import time
 import math
 import random
 import asyncio
+from array import array
 from abc import ABC, abstractmethod
-from .connection import RadarConnection
-from .parser import DataParser
+from .metrics import METRICS
+from .frame import VitalsFrame
 
 class DataSource(ABC):
     @abstractmethod
     def get_data(self):
-        """Returns a dictionary of vital sign data or None."""
+        """Returns a VitalsFrame or None."""
         pass
 
     @abstractmethod
@@ -17,13 +18,25 @@ class DataSource(ABC):
         pass
 
 class DummySensor(DataSource):
-    def __init__(self):
+    FRAME_PERIOD_S = 0.05
+
+    def __init__(self, realtime=False):
+        # realtime paces frames at 20 FPS (None in between) like a real sensor;
+        # otherwise every call returns the next frame, for benchmarks
+        self.realtime = realtime
+        self.next_due = time.monotonic()
         self.t = 0
         self.base_heart_rate = 75  # Base heart rate
         self.base_breath_rate = 16  # Base breathing rate
         print("[INFO] Using Dummy Sensor (Simulation Mode)")
 
     def get_data(self):
+        if self.realtime:
+            now = time.monotonic()
+            if now < self.next_due:
+                return None
+            self.next_due = max(self.next_due + self.FRAME_PERIOD_S, now - 1.0)
+
         # Simulate 20 FPS (50ms per frame)
         self.t += 0.05 
         
@@ -56,7 +69,7 @@ class DummySensor(DataSource):
         breath_energy = 1200 + 300 * abs(breath_wave) + random.uniform(-80, 80)
         
         # Range profile simulation 
-        range_profile = []
+        range_profile = array('d')
         for i in range(64):  # 64 range bins
             distance_m = 0.3 + (i * 0.02)  # 0.3m to 1.6m range
             # Simulate human body reflection at ~1m
@@ -67,57 +80,91 @@ class DummySensor(DataSource):
                 reflection = 50 + random.uniform(0, 30)  # Background noise
             range_profile.append(reflection)
 
-        data = {
-            "frame": int(self.t * 20),
-            "vitals": {
-                # Vital signs
-                "heartRateEst_FFT": current_hr,
-                "breathingRateEst_FFT": current_br,
-                
-                # Waveform outputs (these are the key for your charts)
-                "outputFilterBreathOut": breath_wave,
-                "outputFilterHeartOut": heart_wave,
-                
-                # Physical measurements
-                "unwrapPhasePeak_mm": chest_displacement,
-                
-                # Energy measurements
-                "sumEnergyBreathWfm": breath_energy,
-                "sumEnergyHeartWfm": heart_energy,
-                
-                # Range profiless
-                "RangeProfile": range_profile,
-                
-                # Additional fields for completeness
-                "rangeBinIndexMax": 45,  # Peak at ~1m
-                "rangeBinIndexPhase": 45,
-                "maxVal": max(range_profile),
-                "processingCyclesOut": int(self.t * 1000) % 10000,
-                "rangeBinStartIndex": 15,  # 0.6m
-                "rangeBinEndIndex": 60,   # 1.5m
-            }
-        }
-        
-        return data
+        return VitalsFrame(
+            int(self.t * 20),
+            # Vital signs
+            heartRateEst_FFT=current_hr,
+            heartRateEst_FFT_4Hz=current_hr,
+            heartRateEst_xCorr=current_hr,
+            heartRateEst_peakCount=current_hr,
+            breathingRateEst_FFT=current_br,
+            breathingRateEst_xCorr=current_br,
+            breathingRateEst_peakCount=current_br,
+            confidenceMetricBreathOut=0.9,
+            confidenceMetricBreathOut_xCorr=0.9,
+            confidenceMetricHeartOut=0.8,
+            confidenceMetricHeartOut_4Hz=0.8,
+            confidenceMetricHeartOut_xCorr=0.8,
+            motionDetectedFlag=0.0,
+
+            # Waveform outputs (these are the key for your charts)
+            outputFilterBreathOut=breath_wave,
+            outputFilterHeartOut=heart_wave,
+
+            # Physical measurements
+            unwrapPhasePeak_mm=chest_displacement,
+
+            # Energy measurements
+            sumEnergyBreathWfm=breath_energy,
+            sumEnergyHeartWfm=heart_energy,
+
+            # Range profile
+            RangeProfile=range_profile,
+
+            # Additional fields for completeness
+            numDetectedObj=0,
+            rangeBinIndexMax=45,  # Peak at ~1m
+            rangeBinIndexPhase=45,
+            maxVal=max(range_profile),
+            processingCyclesOut=int(self.t * 1000) % 10000,
+            rangeBinStartIndex=15,  # 0.6m
+            rangeBinEndIndex=60,   # 1.5m
+        )
 
     def stop(self):
         print("[INFO] Stopping Dummy Sensor")
 
 class RealSensor(DataSource):
-    def __init__(self, config_lines, cli_port, data_port):
+    def __init__(self, config_lines, cli_port, data_port, profile=None, tracker=None):
+        # pyserial and numpy are only needed with real hardware
+        from .connection import RadarConnection
+        from .supervisor import SupervisedConnection
+        from .parser import DataParser
+
         print(f"[INFO] Connecting to Real Sensor at {cli_port}")
-        self.radar = RadarConnection(cli_port, data_port)
-        self.radar.connect()
-        self.radar.send_configuration(config_lines)
-        self.parser = DataParser()
+        self.profile = profile
+        self.tracker = tracker  # optional PersonTracker for point-cloud profiles
+        # The publisher sends vitals and the range profile; the point cloud is
+        # decoded only for the tracker, otherwise kept raw for whoever asks
+        if tracker is not None:
+            self.parser = DataParser(profile, tlvs=("vitals", "range_profile", "points"))
+        else:
+            self.parser = DataParser(profile, tlvs=("vitals", "range_profile"), lazy_tlvs=("points",))
+        self.link = SupervisedConnection(
+            RadarConnection(cli_port, data_port),
+            config_lines,
+            digest=profile.digest if profile else None,
+            frame_period_s=profile.frame_periodicity_ms / 1000 if profile else 0.05,
+            on_reset=self.parser.reset,
+        )
+        self.link.start()
+        METRICS.add_collector(lambda: {f"link_{k}": v for k, v in self.link.stats.as_dict().items()})
+
+    @property
+    def stats(self):
+        return self.link.stats
 
     def get_data(self):
-        # Read bytes
-        raw_data = self.radar.read_into_buffer()
-        if raw_data:
-            return self.parser.parse_stream(raw_data)
-        return None
+        # Read bytes; the supervisor reconnects behind the scenes if the link drops.
+        # Parse even when nothing new arrived: earlier reads may hold several frames.
+        raw_data = self.link.read()
+        data = self.parser.parse_stream(raw_data)
+        if data:
+            self.link.note_frame(data.frame)
+            if self.tracker is not None and data.points is not None:
+                with METRICS.time("tracking"):
+                    data.targets = [t.as_dict() for t in self.tracker.update(data.points)]
+        return data
 
     def stop(self):
-        self.radar.stop_sensor()
-        self.radar.close()
\ No newline at end of file
+        self.link.close()
\ No newline at end of file
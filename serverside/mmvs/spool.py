@@ -0,0 +1,204 @@
+import os
+import struct
+import zlib
+
+from .batching import join_batch
+
+# Record: uint32 payload length, uint32 crc32(payload), payload (UTF-8 message)
+RECORD_HEADER = struct.Struct('<II')
+SEGMENT_SUFFIX = ".spill"
+CURSOR_FILE = "cursor"
+
+
+class SpillQueue:
+    """
+    Append-only on-disk frame buffer for relay outages.
+
+    Frames are appended to numbered segment files and replayed oldest first.
+    A frame is only forgotten after commit(), so a crash mid-replay re-sends
+    rather than loses it (at-least-once). When the spool exceeds max_bytes the
+    oldest segment is deleted and its frames are counted as dropped. A torn
+    record at the end of a segment (power loss) is truncated on open.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 2 ** 20, segment_bytes=4 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self.segments = {}  # segment number -> record count
+        self.dropped = 0
+        self.writer = None
+        self.write_seg = None
+        self.read_seg = None
+        self.read_offset = 0
+        self.read_count = 0  # records consumed from read_seg
+        self.uncommitted = (None, 0, 0)
+
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(SEGMENT_SUFFIX):
+                number = int(name[:-len(SEGMENT_SUFFIX)])
+                self.segments[number] = self._recover(self._path(number))
+        self._load_cursor()
+
+    # ------------------------------------------------------------ write side
+
+    def append(self, message):
+        payload = message.encode() if isinstance(message, str) else message
+        if self.writer is None or self.writer.tell() >= self.segment_bytes:
+            self._rotate()
+        self.writer.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.writer.flush()
+        self.segments[self.write_seg] += 1
+        self._enforce_cap()
+
+    # ------------------------------------------------------------ read side
+
+    def read_batch(self, max_records=64):
+        """Returns up to max_records of the oldest frames (as str) without consuming them."""
+        if self.writer:
+            self.writer.flush()
+        messages = []
+        seg, offset, count = self.read_seg, self.read_offset, self.read_count
+        while len(messages) < max_records and seg is not None:
+            with open(self._path(seg), 'rb') as f:
+                f.seek(offset)
+                while len(messages) < max_records:
+                    header = f.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    length, _ = RECORD_HEADER.unpack(header)
+                    messages.append(f.read(length).decode())
+                    offset += RECORD_HEADER.size + length
+                    count += 1
+            if len(messages) < max_records and count >= self.segments.get(seg, 0):
+                following = [s for s in self.segments if s > seg]
+                if not following:
+                    break
+                seg, offset, count = min(following), 0, 0
+        self.uncommitted = (seg, offset, count)
+        return messages
+
+    def commit(self):
+        """Marks the frames returned by the last read_batch() as delivered."""
+        seg, offset, count = self.uncommitted
+        if seg is None:
+            return
+        for old in [s for s in self.segments if s < seg]:
+            self._delete(old)
+        self.read_seg, self.read_offset, self.read_count = seg, offset, count
+        if seg != self.write_seg and count >= self.segments.get(seg, 0):
+            self._delete(seg)
+            following = [s for s in self.segments if s > seg]
+            self.read_seg = min(following) if following else None
+            self.read_offset = self.read_count = 0
+        self._save_cursor()
+
+    @property
+    def pending(self):
+        return sum(self.segments.values()) - self.read_count
+
+    def size_bytes(self):
+        return sum(os.path.getsize(self._path(s)) for s in self.segments if os.path.exists(self._path(s)))
+
+    def stats(self):
+        return {"spool_pending": self.pending, "spool_bytes": self.size_bytes(),
+                "spool_dropped": self.dropped}
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+    # ------------------------------------------------------------ internals
+
+    def _path(self, number):
+        return os.path.join(self.directory, f"{number:08d}{SEGMENT_SUFFIX}")
+
+    def _rotate(self):
+        if self.writer:
+            self.writer.close()
+        self.write_seg = max(self.segments, default=0) + 1
+        self.segments[self.write_seg] = 0
+        self.writer = open(self._path(self.write_seg), 'ab')
+        if self.read_seg is None:
+            self.read_seg, self.read_offset, self.read_count = self.write_seg, 0, 0
+
+    def _delete(self, number):
+        self.segments.pop(number, None)
+        try:
+            os.remove(self._path(number))
+        except FileNotFoundError:
+            pass
+
+    def _enforce_cap(self):
+        while self.size_bytes() > self.max_bytes and len(self.segments) > 1:
+            oldest = min(self.segments)
+            lost = self.segments[oldest] - (self.read_count if oldest == self.read_seg else 0)
+            self.dropped += lost
+            self._delete(oldest)
+            if oldest == self.read_seg:
+                self.read_seg, self.read_offset, self.read_count = min(self.segments), 0, 0
+                self.uncommitted = (None, 0, 0)
+            print(f"[WARN] Spool over {self.max_bytes // 2 ** 20} MB, dropped {lost} oldest frames")
+
+    def _recover(self, path):
+        """Counts valid records and truncates a torn or corrupt tail."""
+        count = 0
+        good = 0
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length, crc = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                good = f.tell()
+                count += 1
+        if good < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(good)
+        return count
+
+    def _load_cursor(self):
+        self.read_seg = min(self.segments, default=None)
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as f:
+                seg, offset, count = (int(v) for v in f.read().split())
+        except (FileNotFoundError, ValueError):
+            return
+        if seg in self.segments:
+            self.read_seg, self.read_offset, self.read_count = seg, offset, count
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, CURSOR_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            f.write(f"{self.read_seg or 0} {self.read_offset} {self.read_count}")
+        os.replace(tmp, path)
+
+
+def spill(frames, spool, encode):
+    """Moves every frame waiting in a FrameQueue to the spool; returns how many moved."""
+    moved = 0
+    while True:
+        frame = frames.get_nowait()
+        if frame is None:
+            return moved
+        spool.append(encode(frame))
+        moved += 1
+
+
+async def replay(spool, send, max_records=64):
+    """
+    Sends the oldest spooled frames as one join_batch() message and commits
+    them once the send succeeded. Returns the number of frames sent.
+    """
+    batch = spool.read_batch(max_records)
+    if batch:
+        await send(join_batch(batch))
+        spool.commit()
+    return len(batch)
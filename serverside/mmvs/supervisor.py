@@ -0,0 +1,166 @@
+import time
+import serial
+from .metrics import METRICS
+
+
+class LinkStats:
+    """Recovery metrics for one supervised sensor link."""
+
+    def __init__(self):
+        self.reconnects = 0
+        self.config_pushes = 0
+        self.read_errors = 0
+        self.silences = 0
+        self.frame_gaps = 0
+        self.frames_missed = 0
+        self.last_downtime_s = 0.0
+        self.max_downtime_s = 0.0
+        self.total_downtime_s = 0.0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class SupervisedConnection:
+    """
+    Keeps a RadarConnection alive: detects read errors or a silent data port,
+    reopens the ports with backoff, re-pushes the profile only when the sensor
+    does not resume streaming by itself, and asks the parser to resync.
+    """
+
+    def __init__(self, radar, config_lines, digest=None, frame_period_s=0.05,
+                 on_reset=None, min_backoff=0.5, max_backoff=10.0):
+        self.radar = radar
+        self.config_lines = config_lines
+        self.digest = digest
+        self.on_reset = on_reset
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        # Silence longer than this means the link is dead; shorter waits let a running sensor resume
+        self.silence_timeout = max(1.0, 20 * frame_period_s)
+        self.probe_timeout = max(0.25, 5 * frame_period_s)
+
+        self.stats = LinkStats()
+        self.connected = False
+        self.probing_until = None
+        self.down_since = None
+        self.backoff = min_backoff
+        self.next_attempt = 0.0
+        self.last_rx = 0.0
+        self.last_frame = None
+
+    def start(self):
+        if not self.radar.connect():
+            self._mark_down("open failed")
+            return
+        try:
+            configured = self._configure(force=False)
+        except (serial.SerialException, OSError) as e:
+            self._mark_down(f"config push failed: {e}")
+            return
+        if not configured:
+            self._mark_down("config rejected")
+            return
+        self.connected = True
+        self.last_rx = time.monotonic()
+
+    def read(self):
+        """Returns available bytes, or b'' while the link is down or recovering."""
+        now = time.monotonic()
+        if not self.connected:
+            self._try_reconnect(now)
+            return b''
+
+        try:
+            with METRICS.time("serial_read"):
+                data = self.radar.read_into_buffer()
+        except (serial.SerialException, OSError) as e:
+            self.stats.read_errors += 1
+            self._mark_down(f"read error: {e}")
+            return b''
+
+        if data:
+            self.last_rx = now
+            if self.probing_until is not None:
+                self.probing_until = None
+                self._mark_up(now)
+            return data
+
+        if self.probing_until is not None:
+            if now >= self.probing_until:
+                # Sensor did not resume on its own, it lost its configuration
+                self.probing_until = None
+                try:
+                    configured = self._configure(force=True)
+                except (serial.SerialException, OSError) as e:
+                    self._mark_down(f"config push failed: {e}")
+                    return b''
+                if not configured:
+                    self._mark_down("config rejected")
+                    return b''
+                # Frame numbers restart when the sensor is reconfigured
+                self.last_frame = None
+                self.last_rx = time.monotonic()
+                self._mark_up(self.last_rx)
+        elif now - self.last_rx > self.silence_timeout:
+            self.stats.silences += 1
+            self._mark_down(f"no data for {now - self.last_rx:.1f}s")
+        return b''
+
+    def note_frame(self, frame_number):
+        """Tracks frame-number gaps so dropped frames show up in the stats."""
+        if self.last_frame is not None and frame_number > self.last_frame + 1:
+            self.stats.frame_gaps += 1
+            self.stats.frames_missed += frame_number - self.last_frame - 1
+        self.last_frame = frame_number
+
+    def close(self):
+        if self.connected:
+            try:
+                self.radar.stop_sensor()
+            except (serial.SerialException, OSError):
+                pass
+        self.radar.close()
+        self.connected = False
+
+    def _configure(self, force):
+        """True once the sensor accepted (or already runs) the profile."""
+        self.stats.config_pushes += 1
+        return self.radar.send_configuration(self.config_lines, digest=self.digest, force=force,
+                                      probe_s=self.probe_timeout)
+
+    def _mark_down(self, reason):
+        print(f"\n[WARN] Sensor link down ({reason}), reconnecting...")
+        self.radar.close()
+        self.connected = False
+        self.probing_until = None
+        if self.down_since is None:
+            self.down_since = time.monotonic()
+        self.next_attempt = time.monotonic() + self.backoff
+        # Repeated failures (e.g. a config the sensor keeps rejecting) back off further
+        self.backoff = min(self.backoff * 2, self.max_backoff)
+        if self.on_reset:
+            self.on_reset()
+
+    def _try_reconnect(self, now):
+        if now < self.next_attempt:
+            return
+        if not self.radar.connect():
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+            self.next_attempt = now + self.backoff
+            return
+        self.stats.reconnects += 1
+        self.connected = True
+        self.last_rx = now
+        self.probing_until = now + self.probe_timeout
+
+    def _mark_up(self, now):
+        if self.down_since is not None:
+            downtime = now - self.down_since
+            self.stats.last_downtime_s = downtime
+            self.stats.max_downtime_s = max(self.stats.max_downtime_s, downtime)
+            self.stats.total_downtime_s += downtime
+            print(f"\n[INFO] Sensor link recovered after {downtime:.2f}s")
+        self.down_since = None
+        self.backoff = self.min_backoff
@@ -0,0 +1,84 @@
+import struct
+
+import numpy as np
+
+from .frame import VITAL_FIELDS
+
+# TI demo message types
+MMWDEMO_UART_MSG_DETECTED_POINTS = 1
+MMWDEMO_UART_MSG_RANGE_PROFILE = 2
+MMWDEMO_UART_MSG_VITALSIGN = 6
+
+# Vital sign TLV: 6 header words then 28 floats (see VITAL_FIELDS)
+VITALSIGN_STRUCT = struct.Struct('<HHfIHH28f')
+
+
+class TlvHandler:
+    __slots__ = ("type", "name", "fields", "decode")
+
+    def __init__(self, tlv_type, name, fields, decode):
+        self.type = tlv_type
+        self.name = name
+        self.fields = fields
+        self.decode = decode
+
+
+TLV_HANDLERS = {}  # TLV type -> TlvHandler
+FIELD_TLVS = {}    # VitalsFrame attribute -> TLV type that fills it
+
+
+def register_tlv(tlv_type, name, fields):
+    """
+    Registers decode(frame, buf, offset, length) for a TLV type. The handler
+    sets the listed VitalsFrame attributes from length bytes of buf (a numpy
+    uint8 buffer or bytes) starting at offset. New firmware outputs plug in
+    here; parsers only run handlers a consumer asked for.
+    """
+    def register(decode):
+        TLV_HANDLERS[tlv_type] = TlvHandler(tlv_type, name, tuple(fields), decode)
+        for field in fields:
+            FIELD_TLVS[field] = tlv_type
+        return decode
+    return register
+
+
+def resolve(wanted):
+    """Maps TLV names, TLV types or field names to the set of TLV types that provide them."""
+    by_name = {h.name: t for t, h in TLV_HANDLERS.items()}
+    types = set()
+    for item in wanted:
+        if item in TLV_HANDLERS:
+            types.add(item)
+        elif item in by_name:
+            types.add(by_name[item])
+        elif item in FIELD_TLVS:
+            types.add(FIELD_TLVS[item])
+        else:
+            raise ValueError(f"No registered TLV provides {item!r}")
+    return types
+
+
+# ---------------------------------------------------------------- built-in TLVs
+
+@register_tlv(MMWDEMO_UART_MSG_DETECTED_POINTS, "points", ("points",))
+def decode_points(frame, buf, offset, length):
+    # Detected points: (x, y, z, velocity) float32 per point, decoded as one (N, 4) array
+    num_points = length // 16
+    frame.points = np.frombuffer(buf, dtype='<f4', count=num_points * 4,
+                                 offset=offset).reshape(num_points, 4).copy()
+
+
+@register_tlv(MMWDEMO_UART_MSG_RANGE_PROFILE, "range_profile", ("RangeProfile",))
+def decode_range_profile(frame, buf, offset, length):
+    # Range profile is array of 16-bit complex numbers (Real(2) + Imag(2) = 4 bytes per bin),
+    # big endian as usual for TI DSP data
+    num_bins = length // 4
+    iq = np.frombuffer(buf, dtype='>i2', count=num_bins * 2, offset=offset).astype(np.float64)
+    frame.RangeProfile = np.hypot(iq[0::2], iq[1::2])
+
+
+@register_tlv(MMWDEMO_UART_MSG_VITALSIGN, "vitals", VITAL_FIELDS)
+def decode_vitals(frame, buf, offset, length):
+    # One unpack for the whole TLV (struct definition in docs/C code)
+    frame.set_vitals(VITALSIGN_STRUCT.unpack_from(buf, offset))
+    frame.heartRateEst_FFT_4Hz /= 2
@@ -0,0 +1,99 @@
+import math
+
+
+def _prepend(message, key, value):
+    # Adds a member to a JSON object message without decoding it; non-object
+    # or binary messages pass through untouched
+    if not isinstance(message, str) or message[:1] != "{":
+        return message
+    sep = "" if message[1:2] == "}" else ","
+    return f'{{"{key}":{value:.6f}{sep}{message[1:]}'
+
+
+def stamp_relay(message, rx):
+    """Prepends the wall-clock time the relay received the message."""
+    return _prepend(message, "relay_rx", rx)
+
+
+def stamp_forward(message, tx):
+    """
+    Prepends the wall-clock time the relay handed the message to one client's
+    socket, so relay_tx - relay_rx covers peer forwarding, fan-out and the
+    clients served before this one.
+    """
+    return _prepend(message, "relay_tx", tx)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+class SensorTrace:
+    """Latency samples (seconds) and sequence gaps for one sensor."""
+
+    def __init__(self):
+        self.total = []     # capture -> delivered to this client
+        self.to_relay = []  # capture -> relay receive
+        self.in_relay = []  # relay receive -> handed to this client's socket
+        self.received = 0
+        self.gaps = 0
+        self.missing = 0
+        self.reordered = 0
+        self.last_seq = None
+
+    def add(self, payload, now):
+        self.received += 1
+        ts = payload.get("ts")
+        rx = payload.get("relay_rx")
+        tx = payload.get("relay_tx")
+        if ts is not None:
+            self.total.append(now - ts)
+            if rx is not None:
+                self.to_relay.append(rx - ts)
+        if rx is not None and tx is not None:
+            self.in_relay.append(tx - rx)
+
+        seq = payload.get("seq")
+        if seq is None:
+            return
+        if self.last_seq is not None:
+            if seq > self.last_seq + 1:
+                self.gaps += 1
+                self.missing += seq - self.last_seq - 1
+            elif seq <= self.last_seq:
+                self.reordered += 1
+        self.last_seq = seq if self.last_seq is None else max(seq, self.last_seq)
+
+    def summary(self, budget_s=None):
+        out = {"received": self.received, "gaps": self.gaps,
+               "missing": self.missing, "reordered": self.reordered}
+        for name, samples in (("total", self.total), ("to_relay", self.to_relay),
+                              ("in_relay", self.in_relay)):
+            values = sorted(samples)
+            out[name] = {
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": (values[-1] if values else 0.0) * 1000,
+            }
+        if budget_s is not None and self.total:
+            over = sum(1 for v in self.total if v > budget_s)
+            out["over_budget"] = over
+            out["within_budget_pct"] = 100.0 * (1 - over / len(self.total))
+        return out
+
+    def reset_samples(self):
+        self.total.clear()
+        self.to_relay.clear()
+        self.in_relay.clear()
+
+    def start_window(self):
+        """
+        Clears samples and counts for the next report window. last_seq is
+        kept, so a gap that straddles the window boundary is still counted.
+        """
+        self.reset_samples()
+        self.received = self.gaps = self.missing = self.reordered = 0
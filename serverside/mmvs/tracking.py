@@ -0,0 +1,134 @@
+import numpy as np
+
+
+def cluster_points(xyz, eps=0.3, min_samples=5):
+    """
+    DBSCAN labels for an (N, 3) array, -1 for noise. Uses scikit-learn when it
+    is installed; otherwise a vectorized numpy version, fine for the few
+    hundred points a frame carries.
+    """
+    if len(xyz) == 0:
+        return np.zeros(0, dtype=int)
+    try:
+        from sklearn.cluster import dbscan
+    except ImportError:
+        return _dbscan_numpy(xyz, eps, min_samples)
+    return dbscan(xyz, eps=eps, min_samples=min_samples)[1]
+
+
+def _dbscan_numpy(xyz, eps, min_samples):
+    diff = xyz[:, None, :] - xyz[None, :, :]
+    neighbors = np.einsum('ijk,ijk->ij', diff, diff) <= eps * eps
+    core = neighbors.sum(axis=1) >= min_samples
+    labels = np.full(len(xyz), -1)
+    cluster = 0
+    for seed in np.flatnonzero(core):
+        if labels[seed] != -1:
+            continue
+        labels[seed] = cluster
+        frontier = [seed]
+        while frontier:
+            reached = np.flatnonzero(neighbors[frontier].any(axis=0) & (labels == -1))
+            labels[reached] = cluster
+            # Only core points extend the cluster; border points just join it
+            frontier = reached[core[reached]].tolist()
+        cluster += 1
+    return labels
+
+
+class Track:
+    __slots__ = ("id", "x", "y", "z", "vx", "vy", "num_points", "age", "misses")
+
+    def __init__(self, track_id, centroid, num_points):
+        self.id = track_id
+        self.x, self.y, self.z = (float(v) for v in centroid)
+        self.vx = self.vy = 0.0
+        self.num_points = num_points
+        self.age = 1
+        self.misses = 0
+
+    def elapsed(self, frame_dt):
+        """Seconds since the last correction: one frame plus every frame missed since."""
+        return (self.misses + 1) * frame_dt
+
+    def predict(self, dt):
+        return self.x + self.vx * dt, self.y + self.vy * dt
+
+    def as_dict(self):
+        return {"id": self.id, "x": round(self.x, 3), "y": round(self.y, 3), "z": round(self.z, 3),
+                "vx": round(self.vx, 3), "vy": round(self.vy, 3), "points": self.num_points}
+
+
+class PersonTracker:
+    """
+    Separates the people in a point cloud and keeps a stable id per person.
+
+    Each frame is handled incrementally: points within gate_m of a live
+    track's predicted position are assigned to it first (one vectorized
+    distance matrix), and only the leftovers go through DBSCAN to start new
+    tracks. A track whose points disappear for max_misses frames is dropped.
+    Positions are smoothed with an exponential filter (alpha = weight of the
+    new measurement).
+    """
+
+    def __init__(self, eps=0.3, min_points=5, gate_m=0.6, alpha=0.5, max_misses=10, frame_period_s=0.05):
+        self.eps = eps
+        self.min_points = min_points
+        self.gate_m = gate_m
+        self.alpha = alpha
+        self.max_misses = max_misses
+        self.dt = frame_period_s
+        self.tracks = []
+        self.next_id = 1
+
+    def update(self, points):
+        """Takes an (N, 4) x, y, z, velocity array; returns the tracks seen in this frame."""
+        xyz = np.asarray(points, dtype=np.float32)[:, :3]
+        unassigned = np.ones(len(xyz), dtype=bool)
+
+        if self.tracks and len(xyz):
+            predicted = np.array([t.predict(t.elapsed(self.dt)) for t in self.tracks], dtype=np.float32)
+            dist = np.linalg.norm(xyz[:, None, :2] - predicted[None, :, :], axis=2)
+            nearest = dist.argmin(axis=1)
+            in_gate = dist[np.arange(len(xyz)), nearest] <= self.gate_m
+            for i, track in enumerate(self.tracks):
+                mine = in_gate & (nearest == i)
+                if mine.sum() >= self.min_points:
+                    self._correct(track, xyz[mine].mean(axis=0), int(mine.sum()))
+                    unassigned &= ~mine
+                else:
+                    track.misses += 1
+        else:
+            for track in self.tracks:
+                track.misses += 1
+
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        rest = xyz[unassigned]
+        labels = cluster_points(rest, self.eps, self.min_points)
+        for label in range(labels.max() + 1 if len(labels) else 0):
+            members = rest[labels == label]
+            self.tracks.append(Track(self.next_id, members.mean(axis=0), len(members)))
+            self.next_id += 1
+
+        return [t for t in self.tracks if t.misses == 0]
+
+    def _correct(self, track, centroid, num_points):
+        a = self.alpha
+        x, y, z = (float(v) for v in centroid)
+        # Blend with the prediction over the time since the last correction, so
+        # a track re-acquired after a dropout neither lags nor spikes its velocity
+        dt = track.elapsed(self.dt)
+        px, py = track.predict(dt)
+        nx = px + a * (x - px)
+        ny = py + a * (y - py)
+        track.vx += a * ((nx - track.x) / dt - track.vx)
+        track.vy += a * ((ny - track.y) / dt - track.vy)
+        track.x, track.y = nx, ny
+        track.z += a * (z - track.z)
+        track.num_points = num_points
+        track.age += 1
+        track.misses = 0
+
+    def reset(self):
+        self.tracks = []
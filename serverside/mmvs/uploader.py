@@ -0,0 +1,95 @@
+import os
+import re
+import tempfile
+import time
+
+
+class ConfigUploader:
+    """Streams CLI commands and waits for the device's Done/Error reply to each."""
+
+    DONE = "Done"
+    ERROR = "Error"
+    SLOW_COMMANDS = ("sensorStart", "flushCfg")
+
+    def __init__(self, cli_serial, timeout=1.0, slow_timeout=3.0):
+        self.cli = cli_serial
+        self.timeout = timeout
+        self.slow_timeout = slow_timeout
+        self.port_name = getattr(cli_serial, "port", None)
+        # Digest of the last profile the device acknowledged, kept on disk so a
+        # restarted publisher knows what a still-running sensor was given
+        port_id = re.sub(r"[^A-Za-z0-9]+", "_", str(self.port_name)).strip("_")
+        self.state_path = os.path.join(tempfile.gettempdir(), f"mmvs-cfg-{port_id}.sha256")
+
+    def applied_digest(self):
+        try:
+            with open(self.state_path) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def is_applied(self, digest):
+        """True if this profile was the last one the device acknowledged."""
+        return digest is not None and self.applied_digest() == digest
+
+    def forget(self):
+        """Marks the device as unconfigured, e.g. after sensorStop or a failed upload."""
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+    def _remember(self, digest):
+        try:
+            with open(self.state_path, "w") as f:
+                f.write(digest)
+        except OSError:
+            pass
+
+    def send_command(self, command):
+        """Sends one command. Returns (ok, reply_lines); ok is None on timeout."""
+        slow = any(command.startswith(c) for c in self.SLOW_COMMANDS)
+        deadline = time.monotonic() + (self.slow_timeout if slow else self.timeout)
+
+        saved_timeout = self.cli.timeout
+        self.cli.timeout = 0.05
+        try:
+            self.cli.write((command + '\n').encode())
+
+            reply = []
+            while time.monotonic() < deadline:
+                raw = self.cli.readline()
+                if not raw:
+                    continue
+                line = raw.decode(errors="ignore").strip()
+                if not line:
+                    continue
+                reply.append(line)
+                if line.endswith(self.DONE):
+                    return True, reply
+                if self.ERROR in line:
+                    return False, reply
+            return None, reply
+        finally:
+            self.cli.timeout = saved_timeout
+
+    def upload(self, commands, digest=None):
+        """
+        Pushes a configuration. Returns a list of (command, reply_lines) for every
+        command that errored or timed out; empty means the device accepted all.
+        """
+        self.forget()
+        self.cli.reset_input_buffer()
+        errors = []
+        for command in commands:
+            if not command or command.startswith('%'):
+                continue
+            ok, reply = self.send_command(command)
+            if not ok:
+                status = "timed out" if ok is None else "failed"
+                print(f"[ERROR] '{command}' {status}: {' | '.join(reply)}")
+                errors.append((command, reply))
+
+        if not errors and digest is not None:
+            self._remember(digest)
+        return errors
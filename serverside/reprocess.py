@@ -0,0 +1,151 @@
+"""
+Re-decodes recorded raw UART captures offline, in parallel, into one column per field.
+
+    python reprocess.py session-*.bin --output-dir reprocessed --workers 8
+
+Each capture is memory-mapped and split into chunks of about --chunk-mb at
+magic-word boundaries; chunks are decoded across a process pool and written
+back in order as <output-dir>/<capture>.npz, one array per field plus the
+frame number and byte offset of every frame. Only the TLVs that provide
+--fields are decoded. --analyze module:function runs on every chunk's columns
+(a dict of numpy arrays) and the columns it returns are stored alongside, so
+thresholds can be re-tuned over old sessions without re-recording them.
+"""
+import argparse
+import importlib
+import mmap
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mmvs.config import FRAME_HEADER_LEN, load_profile
+from mmvs.frame import VITAL_FIELDS
+from mmvs.parser import decode_frame, frame_is_valid
+from mmvs.tlv import TLV_HANDLERS, resolve
+
+MAGIC_WORD = bytes([2, 1, 4, 3, 6, 5, 8, 7])
+DEFAULT_PROFILE = "profiles/xwr6843_profile_VitalSigns_20fps_Front.cfg"
+
+
+def split_capture(path, chunk_bytes):
+    """(start, end) byte ranges of a capture, each starting on a magic word."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        bounds = []
+        for target in range(0, size, chunk_bytes):
+            start = mm.find(MAGIC_WORD, target)
+            if start < 0:
+                break
+            if not bounds or start > bounds[-1]:
+                bounds.append(start)
+    return list(zip(bounds, bounds[1:] + [size]))
+
+
+def _tlv_fields(fields):
+    # numDetectedObj comes from the frame header, not from a TLV
+    return [name for name in fields if name != "numDetectedObj"]
+
+
+def _load_function(spec):
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def process_chunk(task):
+    """
+    Decodes every frame starting in [start, end). A frame is accepted only if
+    its length fits the profile, its TLVs stay inside it and the next magic
+    word (or end of file) follows it; otherwise decoding resyncs on the next
+    magic word. A chunk boundary that fell inside a frame is rejected the
+    same way.
+    """
+    path, start, end, fields, profile, analyze = task
+    max_frame_len = profile.max_frame_len
+    handlers = {t: TLV_HANDLERS[t].decode for t in resolve(_tlv_fields(fields))}
+    offsets, frames, values = [], [], {name: [] for name in fields}
+    corrupt = truncated = 0
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        pos = start
+        while 0 <= pos < end:
+            total_len = int.from_bytes(mm[pos + 12:pos + 16], byteorder='little')
+            nxt = pos + total_len
+            if nxt > size and total_len <= max_frame_len:
+                truncated += 1
+                break
+            if not FRAME_HEADER_LEN <= total_len <= max_frame_len \
+                    or (nxt < size and mm[nxt:nxt + 8] != MAGIC_WORD) \
+                    or not frame_is_valid(mm, pos, total_len, profile):
+                corrupt += 1
+                pos = mm.find(MAGIC_WORD, pos + 1)
+                continue
+
+            frame = decode_frame(mm, pos, handlers)
+            offsets.append(pos)
+            frames.append(frame.frame)
+            for name in fields:
+                value = getattr(frame, name)
+                values[name].append(np.nan if value is None else value)
+            pos = nxt
+
+    columns = {"offset": np.array(offsets, dtype=np.int64), "frame": np.array(frames, dtype=np.int64)}
+    for name in fields:
+        columns[name] = np.array(values[name], dtype=np.float64)
+    if analyze:
+        columns.update(_load_function(analyze)(columns))
+    return path, columns, corrupt, truncated
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("captures", nargs="+", help="raw UART capture files")
+    ap.add_argument("--output-dir", default="reprocessed")
+    ap.add_argument("--profile", default=DEFAULT_PROFILE, help="sensor config the captures were recorded with")
+    ap.add_argument("--fields", nargs="*", default=list(VITAL_FIELDS) + ["numDetectedObj"],
+                    help="VitalsFrame fields to extract (default: every vital sign field)")
+    ap.add_argument("--analyze", help="module:function applied to each chunk's columns")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--chunk-mb", type=float, default=16)
+    args = ap.parse_args(argv)
+
+    profile = load_profile(args.profile)
+    fields = tuple(args.fields)
+    resolve(_tlv_fields(fields))  # fail early on fields no TLV provides
+    chunk_bytes = max(1, int(args.chunk_mb * 1024 * 1024))
+
+    t0 = time.perf_counter()
+    tasks = [(path, start, end, fields, profile, args.analyze)
+             for path in args.captures for start, end in split_capture(path, chunk_bytes)]
+
+    results = {path: [] for path in args.captures}
+    corrupt = truncated = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # map() keeps task order, so chunks come back in file order
+        for path, columns, bad, cut in pool.map(process_chunk, tasks):
+            results[path].append(columns)
+            corrupt += bad
+            truncated += cut
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    total_frames = 0
+    for path, chunks in results.items():
+        out = os.path.join(args.output_dir, os.path.splitext(os.path.basename(path))[0] + ".npz")
+        if chunks:
+            columns = {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+        else:
+            columns = {"offset": np.zeros(0, dtype=np.int64), "frame": np.zeros(0, dtype=np.int64)}
+        np.savez(out, **columns)
+        total_frames += len(columns["frame"])
+        print(f"[REPROCESS] {path}: {len(columns['frame'])} frames -> {out}")
+
+    elapsed = time.perf_counter() - t0
+    recorded_s = total_frames / profile.fps if profile.fps else 0
+    print(f"[REPROCESS] {total_frames} frames ({recorded_s / 3600:.2f} h recorded) in {elapsed:.2f} s "
+          f"with {args.workers} workers, {len(tasks)} chunks | corrupt={corrupt} truncated={truncated}")
+
+
+if __name__ == "__main__":
+    main()
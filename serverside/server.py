@@ -3,21 +3,48 @@ import websockets
 import json
 from dotenv import load_dotenv
 import os
+import multiprocessing
+import socket
+import tempfile
+import time
+from mmvs.metrics import METRICS
+from mmvs.trace import stamp_relay, stamp_forward
+from mmvs.batching import split_batch
 
-load_dotenv()  
+load_dotenv()
 PORT=os.getenv("PORT")
+METRICS_PORT=os.getenv("RELAY_METRICS_PORT")  # serve /metrics when set
+WORKERS=int(os.getenv("RELAY_WORKERS", "1"))  # >1 runs one relay process per core
 
 CONNECTED_CLIENTS = set()
+PEER_LINK = None  # set in worker processes when RELAY_WORKERS > 1
 
-async def handler(websocket, path):
+
+async def broadcast(message, sender=None):
+    with METRICS.time("relay_fanout"):
+        for client in list(CONNECTED_CLIENTS):
+            if client != sender:
+                try:
+                    await client.send(stamp_forward(message, time.time()))
+                    METRICS.inc("relay_messages_out")
+                except websockets.exceptions.ConnectionClosed:
+                    pass
+
+
+async def handler(websocket, path=None):
     CONNECTED_CLIENTS.add(websocket)
     print(f"[SERVER] Client connected. Total: {len(CONNECTED_CLIENTS)}")
-    
+
     try:
         async for message in websocket:
-            for client in CONNECTED_CLIENTS:
-                if client != websocket:
-                    await client.send(message)
+            rx = time.time()
+            METRICS.inc("relay_messages_in")
+            # Publishers may batch frames; clients always get one frame per message
+            for frame in split_batch(message):
+                frame = stamp_relay(frame, rx)
+                if PEER_LINK:
+                    PEER_LINK.publish(frame)
+                await broadcast(frame, sender=websocket)
 
     except websockets.exceptions.ConnectionClosed:
         pass
@@ -26,10 +53,83 @@ async def handler(websocket, path):
         print(f"[SERVER] Client disconnected. Total: {len(CONNECTED_CLIENTS)}")
 
 
+def serve_metrics(offset=0):
+    if METRICS_PORT:
+        METRICS.prefix = "relay"
+        METRICS.add_collector(lambda: {"clients": len(CONNECTED_CLIENTS)})
+        METRICS.serve(int(METRICS_PORT) + offset)
+
+
 async def main():
+    serve_metrics()
     print(f"[SERVER] Starting WebSocket Server on port {PORT}...")
     async with websockets.serve(handler, "0.0.0.0", PORT):
         await asyncio.Future()  # Run forever
 
+
+# -------------------- MULTI-CORE MODE --------------------
+# Each worker binds the same port with SO_REUSEPORT so the kernel spreads
+# client connections across cores. A message published to one worker reaches
+# the others through a broker on a Unix socket in the parent process.
+
+def reuseport_socket(port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(("0.0.0.0", int(port)))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+
+async def worker_main(index, broker_path):
+    from mmvs.cluster import PeerLink
+    global PEER_LINK
+
+    serve_metrics(offset=index)
+    PEER_LINK = PeerLink(broker_path, broadcast)
+    link_task = asyncio.create_task(PEER_LINK.run())
+    print(f"[SERVER] Worker {index} (pid {os.getpid()}) listening on port {PORT}")
+    async with websockets.serve(handler, sock=reuseport_socket(PORT)):
+        await link_task
+
+
+def run_worker(index, broker_path):
+    try:
+        asyncio.run(worker_main(index, broker_path))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_cluster(workers):
+    from mmvs.cluster import Broker
+
+    broker_path = os.path.join(tempfile.gettempdir(), f"rastress-relay-{PORT}.sock")
+    if os.path.exists(broker_path):
+        os.unlink(broker_path)
+
+    # Workers start before the broker loop and retry until its socket exists
+    procs = [multiprocessing.Process(target=run_worker, args=(i, broker_path), daemon=True)
+             for i in range(workers)]
+    for p in procs:
+        p.start()
+
+    print(f"[SERVER] Starting {workers} relay workers on port {PORT}...")
+    try:
+        asyncio.run(Broker(broker_path).serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()
+        if os.path.exists(broker_path):
+            os.unlink(broker_path)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    if WORKERS > 1 and hasattr(socket, "SO_REUSEPORT") and hasattr(socket, "AF_UNIX"):
+        run_cluster(WORKERS)
+    else:
+        if WORKERS > 1:
+            print("[SERVER] SO_REUSEPORT is not available here, running a single worker.")
+        asyncio.run(main())
@@ -1,39 +1,82 @@
 # laptop_publisher.py
 import os
 import time
-import json
-import queue
 import threading
 import asyncio
+import platform
 import struct
+import itertools
+import signal
 import numpy as np
 import serial
 from collections import deque
 from dotenv import load_dotenv
-from pyqtgraph.Qt import QtWidgets
-import pyqtgraph as pg
-from mmvs.com import serialConfig, parseConfigFile
+from mmvs.config import load_profile, FRAME_HEADER_LEN, TLV_HEADER_LEN
+from mmvs.metrics import METRICS
+from mmvs.batching import FrameBatcher, compression_options
+from mmvs.framequeue import FrameQueue
+from mmvs.frame import VitalsFrame, json_members
+from mmvs.parser import MAGIC_BYTES, frame_is_valid
+from mmvs.spool import SpillQueue, spill, replay
 
 load_dotenv()
 IP=os.getenv("IP")
 PORT=os.getenv("PORT")
-WS_RELAY_URL = os.getenv(f"ws://{IP}:{PORT}")  # set your relay server here
+WS_RELAY_URL = f"ws://{IP}:{PORT}"  # set your relay server here
 WS_SEND_QUEUE_MAX = 1000
+WS_SEND_QUEUE_POLICY = os.getenv("QUEUE_POLICY", "drop-oldest")  # drop-oldest | drop-newest | coalesce-latest
+BATCH_MAX_DELAY_MS = float(os.getenv("BATCH_MAX_DELAY_MS", "0"))
+BATCH_MAX_FRAMES = int(os.getenv("BATCH_MAX_FRAMES", "32"))
+WS_COMPRESSION = compression_options(
+    os.getenv("WS_COMPRESSION", "deflate"),
+    level=os.getenv("WS_COMPRESSION_LEVEL"),
+    window_bits=os.getenv("WS_COMPRESSION_WINDOW_BITS"),
+    mem_level=os.getenv("WS_COMPRESSION_MEM_LEVEL"),
+)
+SENSOR_ID = os.getenv("SENSOR_ID", platform.node())
+PLOT = os.getenv("TESTAPI_PLOT", "1") != "0"  # 0 = headless: acquire and publish only
+PLOT_FPS = float(os.getenv("TESTAPI_PLOT_FPS", "0"))  # 0 = display refresh rate
+PLOT_HISTORY = 250  # frames shown per waveform
+SPOOL_DIR = os.getenv("SPOOL_DIR", "spool")  # frames from relay outages are replayed from here; empty disables
+SPOOL_MAX_MB = float(os.getenv("SPOOL_MAX_MB", "256"))
+PROFILE_PATH = 'profiles/xwr6843_profile_VitalSigns_20fps_Front.cfg'
+profile = load_profile(PROFILE_PATH)
 
 # -------------------- SHARED BUFFERS / STATE --------------------
-send_queue = queue.Queue(maxsize=WS_SEND_QUEUE_MAX)
+send_queue = FrameQueue(maxsize=WS_SEND_QUEUE_MAX, policy=WS_SEND_QUEUE_POLICY)
+METRICS.add_collector(send_queue.stats)
+send_seq = itertools.count()
 
-byteBuffer = np.zeros(2 ** 15, dtype='uint8')
+maxBufferSize = max(2 ** 15, 4 * profile.max_frame_len)
+VITALSIGN_STRUCT = struct.Struct('<HHfIHH28f')
+byteBuffer = np.zeros(maxBufferSize, dtype='uint8')
 byteBufferLength = 0
-numRangeBinProcessed = 33 - 11 + 1
 
 # Time-series and UI buffers
-Breathsignal = list(range(0, 250))
-Heartbeatsignal = list(range(0, 250))
-Chestdisplacement = [0] * 250
-Rangeprofile = [0] * 250
-Breathenerge = [0] * 250
-Heartenerge = [0] * 250
+class RingBuffer:
+    """Fixed-size float history updated in place; view() is the last n values, oldest first, without copying."""
+
+    def __init__(self, n):
+        self.n = n
+        self.data = np.zeros(2 * n)  # every value is written twice so the window is always contiguous
+        self.i = 0
+
+    def append(self, value):
+        self.data[self.i] = self.data[self.i + self.n] = value
+        self.i = (self.i + 1) % self.n
+
+    def view(self):
+        return self.data[self.i:self.i + self.n]
+
+# Written by the acquisition thread, drawn by the Qt timer
+Breathsignal = RingBuffer(PLOT_HISTORY)
+Heartbeatsignal = RingBuffer(PLOT_HISTORY)
+Chestdisplacement = RingBuffer(PLOT_HISTORY)
+Breathenerge = RingBuffer(PLOT_HISTORY)
+Heartenerge = RingBuffer(PLOT_HISTORY)
+Rangeprofile = np.zeros(0)
+latest_vitals = None
+frames_acquired = 0
 
 state = {
     "frameNumber": 0,
@@ -56,27 +99,17 @@ heart_wave = deque(maxlen=250)
 chest_wave = deque(maxlen=250)
 
 # -------------------- UTIL --------------------
-def safe_json(obj):
-    """Convert parser outputs to JSON-serializable python types."""
-    if obj is None:
-        return None
-    if isinstance(obj, (int, float, str, bool)):
-        return obj
-    if isinstance(obj, np.ndarray):
-        return obj.tolist()
-    if isinstance(obj, bytes):
-        return obj.decode(errors='ignore')
-    if isinstance(obj, dict):
-        return {k: safe_json(v) for k, v in obj.items()}
-    if isinstance(obj, (list, tuple)):
-        return [safe_json(v) for v in obj]
-    try:
-        return float(obj)
-    except Exception:
-        return str(obj)
+_config_json = (None, None)
+
+def config_json(configParameters: dict):
+    """The config block rarely changes: serialize it once per config object, not per frame."""
+    global _config_json
+    if _config_json[0] is not configParameters:
+        _config_json = (configParameters, json_members(config=configParameters))
+    return _config_json[1]
 
 # -------------------- VITALS CALLBACK (same logic) --------------------
-def on_new_vitals(vitalsign: dict, configParameters: dict, frameNumber: int | None = None):
+def on_new_vitals(vitalsign: VitalsFrame, configParameters: dict, frameNumber: int | None = None):
     if frameNumber is not None:
         state["frameNumber"] = int(frameNumber)
     br = vitalsign.get("breathingRateEst_FFT")
@@ -126,15 +159,14 @@ def on_new_vitals(vitalsign: dict, configParameters: dict, frameNumber: int | No
         except Exception:
             pass
 
-# -------------------- PARSER (copied, unchanged semantics) --------------------
+# -------------------- PARSER (legacy loop, same frame checks as DataParser) --------------------
 def readAndParseData68xx(Dataport, configParameters):
-    global byteBuffer, byteBufferLength, numRangeBinProcessed
+    global byteBuffer, byteBufferLength
     OBJ_STRUCT_SIZE_BYTES = 12
     BYTE_VEC_ACC_MAX_SIZE = 2 ** 15
     MMWDEMO_UART_MSG_DETECTED_POINTS = 1
     MMWDEMO_UART_MSG_RANGE_PROFILE = 2
     MMWDEMO_UART_MSG_VITALSIGN = 6
-    maxBufferSize = 2 ** 15
     tlvHeaderLengthInBytes = 8
     pointLengthInBytes = 16
     magicWord = [2, 1, 4, 3, 6, 5, 8, 7]
@@ -142,7 +174,7 @@ def readAndParseData68xx(Dataport, configParameters):
     magicOK = 0
     dataOK = 0
     frameNumber = 0
-    vitalsign = {}
+    vitalsign = VitalsFrame()
 
     try:
         readBuffer = Dataport.read(Dataport.in_waiting or 1)
@@ -170,17 +202,31 @@ def readAndParseData68xx(Dataport, configParameters):
 
         if startIdx:
             if 0 < startIdx[0] < byteBufferLength:
-                byteBuffer[:byteBufferLength - startIdx[0]] = byteBuffer[startIdx[0]:byteBufferLength]
-                byteBuffer[byteBufferLength - startIdx[0]:] = np.zeros(len(byteBuffer[byteBufferLength - startIdx[0]:]),
-                                                                       dtype='uint8')
-                byteBufferLength = byteBufferLength - startIdx[0]
-
-            if byteBufferLength < 0:
-                byteBufferLength = 0
-            if byteBufferLength < 16:
+                dropBytes(startIdx[0])
+                METRICS.inc("resyncs")
+
+            if byteBufferLength < FRAME_HEADER_LEN:
                 return dataOK, None, None
             totalPacketLen = int.from_bytes(byteBuffer[12:12 + 4], byteorder='little')
-            if (byteBufferLength >= totalPacketLen) and (byteBufferLength != 0):
+            numTLVs = int.from_bytes(byteBuffer[32:32 + 4], byteorder='little')
+            # corrupt header -> drop this magic word, resync on the next call
+            if totalPacketLen > profile.max_frame_len:
+                rejectFrame("frames_oversize")
+                return dataOK, None, None
+            if totalPacketLen < FRAME_HEADER_LEN or numTLVs > (totalPacketLen - FRAME_HEADER_LEN) // TLV_HEADER_LEN:
+                rejectFrame("frames_corrupt")
+                return dataOK, None, None
+            if byteBufferLength >= totalPacketLen:
+                # a magic word inside the frame means bytes were lost and the next frame already began
+                nextStart = byteBuffer[8:totalPacketLen].tobytes().find(MAGIC_BYTES)
+                if nextStart >= 0:
+                    METRICS.inc("frames_truncated")
+                    METRICS.inc("resyncs")
+                    dropBytes(8 + nextStart)
+                    return dataOK, None, None
+                if not frame_is_valid(byteBuffer, 0, totalPacketLen, profile):
+                    rejectFrame("frames_corrupt")
+                    return dataOK, None, None
                 magicOK = 1
     if magicOK:
         idX = 0
@@ -191,279 +237,330 @@ def readAndParseData68xx(Dataport, configParameters):
         idX += 4
         frameNumber = int.from_bytes(byteBuffer[idX:idX + 4], byteorder='little'); idX += 4
         idX += 4
-        vitalsign["numDetectedObj"] = numDetectedObj = int.from_bytes(byteBuffer[idX:idX + 4], byteorder='little'); idX += 4
+        vitalsign.numDetectedObj = numDetectedObj = int.from_bytes(byteBuffer[idX:idX + 4], byteorder='little'); idX += 4
         numTLVs = int.from_bytes(byteBuffer[idX:idX + 4], byteorder='little'); idX += 4
         idX += 4  # subFrameNumber
 
         for tlvIdx in range(numTLVs):
             tlv_type = int.from_bytes(byteBuffer[idX:idX + 4], byteorder='little'); idX += 4
             tlv_length = int.from_bytes(byteBuffer[idX:idX + 4], byteorder='little'); idX += 4
+            tlvEnd = idX + tlv_length
 
             if tlv_type == MMWDEMO_UART_MSG_VITALSIGN:
-                vitalsign["rangeBinIndexMax"] = int.from_bytes(byteBuffer[idX:idX + 2], byteorder='little'); idX += 2
-                vitalsign["rangeBinIndexPhase"] = int.from_bytes(byteBuffer[idX:idX + 2], byteorder='little'); idX += 2
-                vitalsign["maxVal"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["processingCyclesOut"] = int.from_bytes(byteBuffer[idX:idX + 4], byteorder='little'); idX += 4
-                vitalsign["rangeBinStartIndex"] = int.from_bytes(byteBuffer[idX:idX + 2], byteorder='little'); idX += 2
-                vitalsign["rangeBinEndIndex"] = int.from_bytes(byteBuffer[idX:idX + 2], byteorder='little'); idX += 2
-                vitalsign["unwrapPhasePeak_mm"] = byteBuffer[idX:idX + 4].view(dtype=np.float32)[0]; idX += 4
-                vitalsign["outputFilterBreathOut"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["outputFilterHeartOut"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["heartRateEst_FFT"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["heartRateEst_FFT_4Hz"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0] / 2; idX += 4
-                vitalsign["heartRateEst_xCorr"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["heartRateEst_peakCount"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["breathingRateEst_FFT"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["breathingRateEst_xCorr"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["breathingRateEst_peakCount"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["confidenceMetricBreathOut"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["confidenceMetricBreathOut_xCorr"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["confidenceMetricHeartOut"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["confidenceMetricHeartOut_4Hz"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["confidenceMetricHeartOut_xCorr"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["sumEnergyBreathWfm"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["sumEnergyHeartWfm"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                vitalsign["motionDetectedFlag"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]; idX += 4
-                idX += 40
-                # RPlength may be after the 40 bytes offset (original code)
-                try:
-                    vitalsign["RPlength"] = struct.unpack('<f', byteBuffer[idX:idX + 4])[0]
-                except Exception:
-                    pass
+                # 6 header words, 18 named floats, 10 reserved floats
+                vitalsign.set_vitals(VITALSIGN_STRUCT.unpack_from(byteBuffer, idX))
+                vitalsign.heartRateEst_FFT_4Hz /= 2
                 dataOK = 1
 
             if tlv_type == MMWDEMO_UART_MSG_RANGE_PROFILE:
-                if vitalsign.__contains__("rangeBinEndIndex"):
-                    numRangeBinProcessed = vitalsign["rangeBinEndIndex"] - vitalsign["rangeBinStartIndex"] + 1
-                vitalsign["RangeProfile"] = []
-                for i in range(numRangeBinProcessed):
-                    RPrealpart = int.from_bytes(byteBuffer[idX:idX + 2], byteorder='big'); idX += 2
-                    RPimagelpart = int.from_bytes(byteBuffer[idX:idX + 2], byteorder='big'); idX += 2
-                    vitalsign["RangeProfile"].append((RPrealpart * RPrealpart + RPimagelpart * RPimagelpart) ** 0.5)
-
-        if 0 < idX < byteBufferLength:
-            shiftSize = totalPacketLen
-            byteBuffer[:byteBufferLength - shiftSize] = byteBuffer[shiftSize:byteBufferLength]
-            byteBuffer[byteBufferLength - shiftSize:] = np.zeros(len(byteBuffer[byteBufferLength - shiftSize:]), dtype='uint8')
-            byteBufferLength = byteBufferLength - shiftSize
-            if byteBufferLength < 0:
-                byteBufferLength = 0
+                numRangeBinProcessed = tlv_length // 4
+                if "rangeBinEndIndex" in vitalsign:
+                    numRangeBinProcessed = min(numRangeBinProcessed,
+                                               vitalsign.rangeBinEndIndex - vitalsign.rangeBinStartIndex + 1)
+                iq = byteBuffer[idX:idX + 4 * numRangeBinProcessed].view('>u2').astype(np.float64)
+                vitalsign.RangeProfile = np.hypot(iq[0::2], iq[1::2])
 
+            # unknown TLVs are skipped by their (already bounds-checked) length
+            idX = tlvEnd
+
+        dropBytes(totalPacketLen)
+
+    vitalsign.frame = frameNumber
     return dataOK, frameNumber, vitalsign
 
+def dropBytes(n):
+    global byteBuffer, byteBufferLength
+    n = min(n, byteBufferLength)
+    byteBuffer[:byteBufferLength - n] = byteBuffer[n:byteBufferLength]
+    byteBuffer[byteBufferLength - n:] = 0
+    byteBufferLength -= n
+
+def rejectFrame(counter):
+    # skip this magic word; the next call resyncs on the following one
+    METRICS.inc(counter)
+    METRICS.inc("resyncs")
+    dropBytes(1)
+
 # -------------------- UPDATE (UI + enqueue to WS) --------------------
 def update_and_enqueue(Dataport, configParameters):
-    dataOk, frameNumber, vitalsign = readAndParseData68xx(Dataport, configParameters)
+    with METRICS.time("read_decode"):
+        dataOk, frameNumber, vitalsign = readAndParseData68xx(Dataport, configParameters)
     if dataOk:
-        # update plotting buffers
-        try:
-            Breathsignal.append(vitalsign["outputFilterBreathOut"])
-            Heartbeatsignal.append(vitalsign["outputFilterHeartOut"])
-            Chestdisplacement.append(float(vitalsign["unwrapPhasePeak_mm"]))
-            Breathenerge.append(float(vitalsign["sumEnergyBreathWfm"]) / 1e6)
-            Heartenerge.append(float(vitalsign["sumEnergyHeartWfm"]))
-            if vitalsign.__contains__("RangeProfile"):
-                global Rangeprofile
-                Rangeprofile = vitalsign["RangeProfile"]
-        except Exception:
-            pass
-
-        # trim
-        if len(Breathsignal) > 250: Breathsignal.pop(0)
-        if len(Heartbeatsignal) > 250: Heartbeatsignal.pop(0)
-        if len(Chestdisplacement) > 250: Chestdisplacement.pop(0)
-        if len(Breathenerge) > 250: Breathenerge.pop(0)
-        if len(Heartenerge) > 250: Heartenerge.pop(0)
-
-        # update label/UI if present (s1..s6 expected to be defined globally)
+        # update plotting buffers in place; drawing happens on the Qt timer, never here
+        global Rangeprofile, latest_vitals, frames_acquired
         try:
-            s1.setData(np.array((list(range(0, 250)), Breathsignal)).T)
-            s2.setData(np.array((list(range(0, 250)), Heartbeatsignal)).T)
-            s3.setData(np.array((list(range(0, 250)), Chestdisplacement)).T)
-            s4.setData(np.array((list(np.arange(0, numRangeBinProcessed * configParameters["rangeResolutionMeters"], configParameters["rangeResolutionMeters"])), Rangeprofile)).T)
-            s5.setData(np.array((list(range(0, 250)), Breathenerge)).T)
-            s6.setData(np.array((list(range(0, 250)), Heartenerge)).T)
-            labelItem1.setText(text='Breath Rate:' + str(vitalsign.get("breathingRateEst_FFT", "")), size='12pt', color='#000000')
-            labelItem2.setText(text='Heart Rate:' + str(vitalsign.get("heartRateEst_FFT", "")), size='12pt', color='#000000')
-            QtWidgets.QApplication.processEvents()
+            Breathsignal.append(vitalsign.outputFilterBreathOut)
+            Heartbeatsignal.append(vitalsign.outputFilterHeartOut)
+            Chestdisplacement.append(vitalsign.unwrapPhasePeak_mm)
+            Breathenerge.append(vitalsign.sumEnergyBreathWfm / 1e6)
+            Heartenerge.append(vitalsign.sumEnergyHeartWfm)
+            if "RangeProfile" in vitalsign:
+                Rangeprofile = vitalsign.RangeProfile
         except Exception:
             pass
+        latest_vitals = vitalsign
+        frames_acquired += 1
 
         # push to local state
         on_new_vitals(vitalsign, configParameters, frameNumber=frameNumber)
 
-        # enqueue JSON-safe payload to send queue
-        payload = {
-            "ts": time.time(),
-            "frame": int(frameNumber),
-            "vitals": safe_json(vitalsign),
-            "config": safe_json(configParameters)
-        }
-        try:
-            send_queue.put_nowait(payload)
-        except queue.Full:
-            # queue overloaded -> drop oldest then put
-            try:
-                _ = send_queue.get_nowait()
-                send_queue.put_nowait(payload)
-            except Exception:
-                pass
+        # the frame serializes itself; only tracing fields and the config block are added
+        vitalsign.ts = time.time()
+        vitalsign.seq = next(send_seq)
+        vitalsign.sensor = SENSOR_ID
+        vitalsign.extra = config_json(configParameters)
+        # overload handling (drop/coalesce) is the queue policy's job
+        send_queue.put(vitalsign)
 
         return True
     return False
 
+def acquisition_loop(Dataport, configParameters, stop_event: threading.Event):
+    """Serial reads run on their own thread so a slow redraw can never back up the UART."""
+    while not stop_event.is_set():
+        try:
+            if not update_and_enqueue(Dataport, configParameters):
+                time.sleep(0.005)  # nothing buffered yet; radar frames are 50 ms apart
+        except Exception:
+            time.sleep(0.01)
+
+# -------------------- PLOTTING (Qt timer) --------------------
+_plot_x = np.arange(PLOT_HISTORY)
+_range_axis = np.zeros(0)
+_range_window = None
+_frames_drawn = -1
+
+def refresh_plots():
+    """Redraws from the ring buffers; skipped when no frame arrived since the last refresh."""
+    global _range_axis, _range_window, _frames_drawn
+    if frames_acquired == _frames_drawn:
+        return
+    _frames_drawn = frames_acquired
+    s1.setData(_plot_x, Breathsignal.view())
+    s2.setData(_plot_x, Heartbeatsignal.view())
+    s3.setData(_plot_x, Chestdisplacement.view())
+    s5.setData(_plot_x, Breathenerge.view())
+    s6.setData(_plot_x, Heartenerge.view())
+    rp = Rangeprofile
+    vitals = latest_vitals
+    window = (vitals.rangeBinStartIndex, vitals.rangeBinEndIndex) if vitals is not None else None
+    if window is not None and None not in window and window != _range_window:
+        _range_window = window
+        _range_axis = np.asarray(profile.range_axis(*window))
+    if len(_range_axis) == len(rp):
+        s4.setData(_range_axis, rp)
+    if vitals is not None:
+        labelItem1.setText(text='Breath Rate:' + str(vitals.get("breathingRateEst_FFT", "")), size='12pt', color='#000000')
+        labelItem2.setText(text='Heart Rate:' + str(vitals.get("heartRateEst_FFT", "")), size='12pt', color='#000000')
+
 # -------------------- ASYNC WEBSOCKET SENDER --------------------
 async def ws_sender_loop(loop_stop_event: threading.Event):
     import websockets
+    spool = None
+    if SPOOL_DIR:
+        spool = SpillQueue(SPOOL_DIR, max_bytes=int(SPOOL_MAX_MB * 2 ** 20))
+        METRICS.add_collector(spool.stats)
     backoff = 1.0
     while not loop_stop_event.is_set():
         try:
-            async with websockets.connect(WS_RELAY_URL, ping_interval=10, ping_timeout=5) as ws:
+            async with websockets.connect(WS_RELAY_URL, ping_interval=10, ping_timeout=5, **WS_COMPRESSION) as ws:
                 print(f"[WS] Connected to relay {WS_RELAY_URL}")
                 backoff = 1.0
-                # send loop: drain queue and send messages
+                batcher = FrameBatcher(BATCH_MAX_DELAY_MS / 1000, BATCH_MAX_FRAMES)
+                batch_payloads = []
+                # send loop: drain queue into batches and send them
                 while not loop_stop_event.is_set():
-                    try:
-                        payload = send_queue.get(timeout=0.5)  # blocking with timeout
-                    except queue.Empty:
-                        await asyncio.sleep(0.01)
+                    if spool and spool.pending:
+                        # catch up on frames spooled during the outage; live frames queue behind them
+                        spill(send_queue, spool, VitalsFrame.to_json)
+                        METRICS.inc("frames_replayed", await replay(spool, ws.send))
                         continue
-                    # send as compact JSON
+                    if not batcher.due():
+                        wait = batcher.time_until_due()
+                        entry = send_queue.get_entry(timeout=0.5 if wait is None else max(wait, 0.001))
+                        if entry is None:
+                            if wait is None:
+                                await asyncio.sleep(0.01)
+                                continue
+                        else:
+                            try:
+                                with METRICS.time("serialize"):
+                                    batcher.add(entry[1].to_json())
+                                batch_payloads.append(entry)
+                            except (TypeError, ValueError) as e:
+                                # drop only the frame that cannot be encoded, not the pending batch
+                                print(f"[WS] Dropping frame {entry[1].frame}: cannot encode ({e})")
+                                METRICS.inc("frames_unencodable")
+                        if not batcher.due():
+                            continue
+                    message = batcher.flush()
                     try:
-                        await ws.send(json.dumps(payload, separators=(",", ":"), ensure_ascii=False))
-                    except Exception as e:
-                        # push back if send fails
-                        try:
-                            send_queue.put_nowait(payload)
-                        except Exception:
-                            pass
-                        raise e
+                        with METRICS.time("ws_send"):
+                            await ws.send(message)
+                        METRICS.inc("messages_sent")
+                        batch_payloads = []
+                    except BaseException:
+                        # put unsent frames back at the head so order survives the reconnect
+                        send_queue.requeue(batch_payloads)
+                        raise
         except Exception as e:
             print(f"[WS] Connection failed: {e}. Reconnect in {backoff:.1f}s")
-            await asyncio.sleep(backoff)
+            # keep the outage on disk instead of letting the bounded queue drop it
+            deadline = time.monotonic() + backoff
+            while time.monotonic() < deadline and not loop_stop_event.is_set():
+                if spool:
+                    spill(send_queue, spool, VitalsFrame.to_json)
+                await asyncio.sleep(0.1)
             backoff = min(backoff * 1.5, 30.0)
+    if spool:
+        spool.close()
 
 def start_ws_thread(loop_stop_event: threading.Event):
     asyncio.run(ws_sender_loop(loop_stop_event))
 
-# -------------------- SETUP SERIAL + CONFIG --------------------
-# using your serialConfig helper from mmVS.com
-CLIport, Dataport = serialConfig('profiles/xwr6843_profile_VitalSigns_20fps_Front.cfg')
-configParameters = parseConfigFile('profiles/xwr6843_profile_VitalSigns_20fps_Front.cfg')
-
-# populate state with config
-try:
-    state["rangeResolution_m"] = float(configParameters.get("rangeResolutionMeters", state["rangeResolution_m"]))
-    state["rangeStart"] = float(configParameters.get("rangeStart", 0.0))
-    state["rangeEnd"] = float(configParameters.get("rangeEnd", 0.0))
-    state["maxRange"] = float(configParameters.get("maxRange", 0.0))
-    if "fps" in configParameters:
-        state["fps"] = int(configParameters["fps"])
-except Exception:
-    pass
-
-# -------------------- START WS SENDER THREAD --------------------
-loop_stop_event = threading.Event()
-ws_thread = threading.Thread(target=start_ws_thread, args=(loop_stop_event,), daemon=True)
-ws_thread.start()
-
-# -------------------- SETUP UI (pyqtgraph) --------------------
-app_qt = QtWidgets.QApplication([])
-pg.setConfigOption('background', 'w')
-win = pg.GraphicsLayoutWidget(show=True, title="Vital Sign")
-win.resize(1200, 700)
-
-# Plot panels (same as original)
-p1 = win.addPlot(row=1, col=0)
-p1.setTitle("Breathing Waveform", color=(0, 128, 128), size='12pt')
-p1.setXRange(0, 250)
-p1.setYRange(-2, 2)
-p1.setLabel('left', text='Position (mm)')
-p1.setLabel('bottom', text='Time (pre 50ms)')
-s1 = p1.plot([], [], pen=pg.mkPen(width=2))
-
-labelItem1 = pg.LabelItem(text='Breath Rate:')
-win.addItem(labelItem1, row=0, col=0)
-
-p2 = win.addPlot(row=1, col=1)
-p2.setTitle("Cardiac Waveform", color='#008080', size='12pt')
-p2.setXRange(0, 250)
-p2.setYRange(-2, 2)
-p2.setLabel('left', text='Position (mm)')
-p2.setLabel('bottom', text='Time (pre 50ms)')
-s2 = p2.plot([], [], pen=pg.mkPen(width=2))
-
-labelItem2 = pg.LabelItem(text='Heartbeat Rate:')
-win.addItem(labelItem2, row=0, col=1)
-
-p3 = win.addPlot(row=2, col=0)
-p3.setTitle("Chest Displacement", color='#008080', size='12pt')
-p3.setXRange(0, 250)
-p3.setLabel('left', text='Displacement (a.u.)')
-p3.setLabel('bottom', text='Frame (pre index)')
-s3 = p3.plot([], [], pen=pg.mkPen(width=2))
-
-p4 = win.addPlot(row=2, col=1)
-p4.setTitle("Range Profile", color='#008080', size='12pt')
-p4.setLabel('left', text='Magnitude (a.u.)')
-p4.setLabel('bottom', text='Range (m)')
-p4.setYRange(0, 100000, padding=0)
-s4 = p4.plot([], [], pen=pg.mkPen(width=2))
-
-p5 = win.addPlot(row=3, col=0)
-p5.setTitle("Breath Energy", color='#008080', size='12pt')
-p5.setXRange(0, 250)
-p5.setLabel('left', text='Wave Energy (a.u.10^6)')
-p5.setLabel('bottom', text='Time (pre 50ms)')
-s5 = p5.plot([], [], pen=pg.mkPen(width=2))
-
-p6 = win.addPlot(row=3, col=1)
-p6.setTitle("Cardiac Energy", color='#008080', size='12pt')
-p6.setXRange(0, 250)
-p6.setLabel('left', text='Wave Energy (a.u.)')
-p6.setLabel('bottom', text='Time (pre 50ms)')
-s6 = p6.plot([], [], pen=pg.mkPen(width=2))
-
-# show config labels
-labelItem3 = pg.LabelItem(text='Range Start:')
-win.addItem(labelItem3, row=5, col=0)
-labelItem3.setText(text='Range Start:' + str(configParameters.get("rangeStart", "")) + " m", size='12pt')
-
-labelItem4 = pg.LabelItem(text='Range End:')
-win.addItem(labelItem4, row=5, col=1)
-labelItem4.setText(text='Range End:' + str(configParameters.get("rangeEnd", "")) + " m", size='12pt')
-
-labelItem5 = pg.LabelItem(text='Max Range:')
-win.addItem(labelItem5, row=6, col=0)
-labelItem5.setText(text='Max Range:' + str(round(configParameters.get("maxRange", 0.0), 2)) + " m", size='12pt')
-
-labelItem6 = pg.LabelItem(text='Range Resolution Meters:')
-win.addItem(labelItem6, row=6, col=1)
-labelItem6.setText(text='Range Resolution:' + str(round(configParameters.get("rangeResolutionMeters", 0.0) * 100, 2)) + " cm", size='12pt')
-
-# -------------------- MAIN LOOP --------------------
-try:
-    while True:
-        try:
-            update_and_enqueue(Dataport, configParameters)
-            # small sleep to reduce CPU; adjust to match radar fps
-            time.sleep(0.005)
-        except Exception:
-            time.sleep(0.01)
-except KeyboardInterrupt:
-    print("Shutting down...")
-    loop_stop_event.set()
-    ws_thread.join(timeout=2)
-    try:
-        CLIport.write(('sensorStop\n').encode())
-    except Exception:
-        pass
+if __name__ == "__main__":
+    from mmvs.com import serialConfig
+
+    # -------------------- SETUP SERIAL + CONFIG --------------------
+    # using your serialConfig helper from mmVS.com
+    CLIport, Dataport = serialConfig(PROFILE_PATH)
+    configParameters = profile.as_params()
+
+    # populate state with config
     try:
-        CLIport.close()
-        Dataport.close()
+        state["rangeResolution_m"] = float(configParameters.get("rangeResolutionMeters", state["rangeResolution_m"]))
+        state["rangeStart"] = float(configParameters.get("rangeStart", 0.0))
+        state["rangeEnd"] = float(configParameters.get("rangeEnd", 0.0))
+        state["maxRange"] = float(configParameters.get("maxRange", 0.0))
+        if "fps" in configParameters:
+            state["fps"] = int(configParameters["fps"])
     except Exception:
         pass
+
+    if os.getenv("METRICS_PORT"):
+        METRICS.serve(os.getenv("METRICS_PORT"))
+
+    # -------------------- START WS SENDER THREAD --------------------
+    loop_stop_event = threading.Event()
+    ws_thread = threading.Thread(target=start_ws_thread, args=(loop_stop_event,), daemon=True)
+    ws_thread.start()
+
+    # -------------------- START ACQUISITION THREAD --------------------
+    acq_thread = threading.Thread(target=acquisition_loop, args=(Dataport, configParameters, loop_stop_event), daemon=True)
+    acq_thread.start()
+
+    # -------------------- SETUP UI (pyqtgraph) --------------------
+    if PLOT:
+        # Qt is only needed for the live window, not for importing the parser
+        from pyqtgraph.Qt import QtCore, QtWidgets
+        import pyqtgraph as pg
+
+        app_qt = QtWidgets.QApplication([])
+        pg.setConfigOption('background', 'w')
+        win = pg.GraphicsLayoutWidget(show=True, title="Vital Sign")
+        win.resize(1200, 700)
+
+        # Plot panels (same as original)
+        p1 = win.addPlot(row=1, col=0)
+        p1.setTitle("Breathing Waveform", color=(0, 128, 128), size='12pt')
+        p1.setXRange(0, 250)
+        p1.setYRange(-2, 2)
+        p1.setLabel('left', text='Position (mm)')
+        p1.setLabel('bottom', text='Time (pre 50ms)')
+        s1 = p1.plot([], [], pen=pg.mkPen(width=2))
+
+        labelItem1 = pg.LabelItem(text='Breath Rate:')
+        win.addItem(labelItem1, row=0, col=0)
+
+        p2 = win.addPlot(row=1, col=1)
+        p2.setTitle("Cardiac Waveform", color='#008080', size='12pt')
+        p2.setXRange(0, 250)
+        p2.setYRange(-2, 2)
+        p2.setLabel('left', text='Position (mm)')
+        p2.setLabel('bottom', text='Time (pre 50ms)')
+        s2 = p2.plot([], [], pen=pg.mkPen(width=2))
+
+        labelItem2 = pg.LabelItem(text='Heartbeat Rate:')
+        win.addItem(labelItem2, row=0, col=1)
+
+        p3 = win.addPlot(row=2, col=0)
+        p3.setTitle("Chest Displacement", color='#008080', size='12pt')
+        p3.setXRange(0, 250)
+        p3.setLabel('left', text='Displacement (a.u.)')
+        p3.setLabel('bottom', text='Frame (pre index)')
+        s3 = p3.plot([], [], pen=pg.mkPen(width=2))
+
+        p4 = win.addPlot(row=2, col=1)
+        p4.setTitle("Range Profile", color='#008080', size='12pt')
+        p4.setLabel('left', text='Magnitude (a.u.)')
+        p4.setLabel('bottom', text='Range (m)')
+        p4.setYRange(0, 100000, padding=0)
+        s4 = p4.plot([], [], pen=pg.mkPen(width=2))
+
+        p5 = win.addPlot(row=3, col=0)
+        p5.setTitle("Breath Energy", color='#008080', size='12pt')
+        p5.setXRange(0, 250)
+        p5.setLabel('left', text='Wave Energy (a.u.10^6)')
+        p5.setLabel('bottom', text='Time (pre 50ms)')
+        s5 = p5.plot([], [], pen=pg.mkPen(width=2))
+
+        p6 = win.addPlot(row=3, col=1)
+        p6.setTitle("Cardiac Energy", color='#008080', size='12pt')
+        p6.setXRange(0, 250)
+        p6.setLabel('left', text='Wave Energy (a.u.)')
+        p6.setLabel('bottom', text='Time (pre 50ms)')
+        s6 = p6.plot([], [], pen=pg.mkPen(width=2))
+
+        # show config labels
+        labelItem3 = pg.LabelItem(text='Range Start:')
+        win.addItem(labelItem3, row=5, col=0)
+        labelItem3.setText(text='Range Start:' + str(configParameters.get("rangeStart", "")) + " m", size='12pt')
+
+        labelItem4 = pg.LabelItem(text='Range End:')
+        win.addItem(labelItem4, row=5, col=1)
+        labelItem4.setText(text='Range End:' + str(configParameters.get("rangeEnd", "")) + " m", size='12pt')
+
+        labelItem5 = pg.LabelItem(text='Max Range:')
+        win.addItem(labelItem5, row=6, col=0)
+        labelItem5.setText(text='Max Range:' + str(round(configParameters.get("maxRange", 0.0), 2)) + " m", size='12pt')
+
+        labelItem6 = pg.LabelItem(text='Range Resolution Meters:')
+        win.addItem(labelItem6, row=6, col=1)
+        labelItem6.setText(text='Range Resolution:' + str(round(configParameters.get("rangeResolutionMeters", 0.0) * 100, 2)) + " cm", size='12pt')
+
+        # redraw at the display refresh rate (or TESTAPI_PLOT_FPS), independent of the radar frame rate
+        refresh_hz = PLOT_FPS or app_qt.primaryScreen().refreshRate() or 60
+        plot_timer = QtCore.QTimer()
+        plot_timer.timeout.connect(refresh_plots)
+        plot_timer.start(int(1000 / refresh_hz))
+
+    # -------------------- MAIN LOOP --------------------
     try:
-        win.close()
-    except Exception:
+        if PLOT:
+            # Ctrl+C closes the window; the timer hands control back to Python so the handler runs
+            signal.signal(signal.SIGINT, lambda *_: app_qt.quit())
+            app_qt.exec()
+        else:
+            while acq_thread.is_alive():
+                acq_thread.join(timeout=0.5)
+    except KeyboardInterrupt:
         pass
+    finally:
+        print("Shutting down...")
+        loop_stop_event.set()
+        acq_thread.join(timeout=2)
+        ws_thread.join(timeout=2)
+        try:
+            CLIport.write(('sensorStop\n').encode())
+        except Exception:
+            pass
+        try:
+            CLIport.close()
+            Dataport.close()
+        except Exception:
+            pass
+        if PLOT:
+            try:
+                win.close()
+            except Exception:
+                pass
@@ -0,0 +1,95 @@
+"""
+Subscribes to the relay like a mobile client and reports frame-to-client
+latency and sequence gaps per sensor.
+
+Latencies use wall-clock stamps from different processes, so run this on the
+same host as the publisher or keep the machines NTP-synced.
+
+    python trace_latency.py --interval 5 --budget-ms 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+import websockets
+from dotenv import load_dotenv
+from mmvs.trace import SensorTrace
+
+load_dotenv()
+
+
+def print_report(traces, budget_s):
+    for sensor, trace in sorted(traces.items()):
+        s = trace.summary(budget_s)
+        t = s["total"]
+        line = (f"[TRACE] {sensor}: n={s['received']} "
+                f"p50={t['p50_ms']:.1f}ms p95={t['p95_ms']:.1f}ms p99={t['p99_ms']:.1f}ms "
+                f"max={t['max_ms']:.1f}ms | relay in={s['to_relay']['p99_ms']:.1f}ms "
+                f"hold={s['in_relay']['p99_ms']:.1f}ms (p99) | gaps={s['gaps']} missing={s['missing']}")
+        if "within_budget_pct" in s:
+            line += f" | within {budget_s * 1000:.0f}ms: {s['within_budget_pct']:.2f}%"
+        print(line)
+
+
+async def run(uri, interval, duration, budget_s, output):
+    traces = defaultdict(SensorTrace)
+    windowed = defaultdict(SensorTrace)  # per report window; keeps last_seq across windows
+    skipped = 0
+    deadline = time.monotonic() + duration if duration else None
+    next_report = time.monotonic() + interval
+
+    print(f"[TRACE] Subscribing to {uri}...")
+    async with websockets.connect(uri) as ws:
+        while deadline is None or time.monotonic() < deadline:
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=interval)
+            except asyncio.TimeoutError:
+                message = None
+
+            if message is not None:
+                now = time.time()
+                try:
+                    payload = json.loads(message)
+                except (TypeError, ValueError):
+                    payload = None
+                if isinstance(payload, dict):
+                    sensor = payload.get("sensor", "unknown")
+                    traces[sensor].add(payload, now)
+                    windowed[sensor].add(payload, now)
+                else:
+                    skipped += 1
+
+            if time.monotonic() >= next_report:
+                print_report(windowed, budget_s)
+                for trace in windowed.values():
+                    trace.start_window()
+                next_report = time.monotonic() + interval
+
+    print("[TRACE] Overall:")
+    print_report(traces, budget_s)
+    if skipped:
+        print(f"[TRACE] Skipped {skipped} messages that were not JSON frames")
+    if output:
+        with open(output, "w") as f:
+            json.dump({k: v.summary(budget_s) for k, v in traces.items()}, f, indent=2)
+        print(f"[TRACE] Summary written to {output}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--uri", default=f"ws://{os.getenv('IP')}:{os.getenv('PORT')}")
+    ap.add_argument("--interval", type=float, default=5.0, help="report window in seconds")
+    ap.add_argument("--duration", type=float, default=0, help="stop after N seconds (0 = forever)")
+    ap.add_argument("--budget-ms", type=float, default=100.0)
+    ap.add_argument("--output", help="write the overall summary as JSON")
+    args = ap.parse_args()
+    try:
+        asyncio.run(run(args.uri, args.interval, args.duration, args.budget_ms / 1000, args.output))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()